@@ -61,6 +61,15 @@ from .sampling_mixin import SamplingMixin
 # 添加窗口大小切换功能和配置管理
 from .window_size_toggle import WindowSizeToggleMixin
 from .config_manager import ConfigMixin
+from .image_cache import ImageCache
+from .prefetch import PrefetchMixin
+from .preview_cache import PreviewCacheMixin
+from .encoded_cache import EncodedCacheMixin
+from .memory_monitor import MemoryMonitorMixin
+from .sort_order import SortOrderMixin
+from .directory_watcher import DirectoryWatcherMixin
+from .listing_store import ListingStoreMixin
+from .folder_navigation import FolderNavigationMixin
 
 
 class ImageViewer(
@@ -91,7 +100,15 @@ class ImageViewer(
     SamplingMixin,
     # 添加窗口大小切换功能和配置管理
     WindowSizeToggleMixin,
-    ConfigMixin
+    ConfigMixin,
+    PrefetchMixin,
+    PreviewCacheMixin,
+    EncodedCacheMixin,
+    MemoryMonitorMixin,
+    SortOrderMixin,
+    DirectoryWatcherMixin,
+    ListingStoreMixin,
+    FolderNavigationMixin
 ):
     """
     图片查看器主类
@@ -115,6 +132,14 @@ class ImageViewer(
         # 初始化配置管理器
         self._init_config_manager()
 
+        # 初始化预加载线程池、预览图缓存和文件字节缓存
+        self._init_prefetch()
+        self._init_preview_cache()
+        self._init_encoded_cache()
+        self._init_directory_watcher()
+        self._init_listing_store()
+        self._init_folder_navigation()
+
         # 创建UI组件
         self._create_ui()
 
@@ -129,6 +154,7 @@ class ImageViewer(
 
         # 更新内存限制并完成初始化
         self.update_memory_limit()
+        self._init_memory_monitor()
         self.beready()
 
         # 启动对话框监控
@@ -146,6 +172,24 @@ class ImageViewer(
         self.zoom_factor = 1.0
         self.last_directory = None
 
+        # 显示分辨率解码：按画布尺寸乘以缩放余量解码，放大超出时再加载原图
+        self.display_target_size = None
+        self.decode_zoom_margin = 1.5
+        self.full_resolution_pending = set()
+        # 超过该像素数的图片使用瓦片模式渲染
+        self.tile_pixel_threshold = 100 * 1000 * 1000
+        # 路径 -> 已解码、等待写入瓦片的超大图片，概览图放入缓存后在后台写入
+        self.tile_sources = {}
+        # 正在后台加载、完成后需要显示的当前图片
+        self.background_loads = set()
+        # 路径 -> 解码时降低分辨率的提示，单飞加载返回后再输出到状态栏
+        self.decode_notices = {}
+
+        # 渲染缓冲区：四周各多渲染视口尺寸的比例，视口距缓冲区边缘小于该比例的余量时重新渲染
+        self.render_buffer = None
+        self.render_overscan = 0.4
+        self.render_overscan_margin = 0.1
+
         # 视口设置
         self.viewport_x = 0
         self.viewport_y = 0
@@ -165,10 +209,7 @@ class ImageViewer(
 
         # 内存管理
         self.cache_ratio = 0.4
-        self.cache_size_limit = 0
-        self.current_cache_size = 0
-        self.image_cache = {}
-        self.lru_list = OrderedDict()
+        self.image_cache = ImageCache()
 
         # 导航控制
         self.navigate_delay = 50
@@ -179,6 +220,18 @@ class ImageViewer(
 
         # 加载状态
         self.loading_active = False
+        self.loading_generation = 0
+        # 本轮后台预热已放入缓存的路径，后续解码腾空间时不淘汰
+        self.warmed_paths = set()
+        self.scan_generation = 0
+        # 扫描期间被目录监视删除的路径，之后到达的扫描结果中的这些路径会被丢弃
+        self.scan_removed = set()
+        self.directory_index = None
+        self.sort_order = 'name'
+        # 递归浏览子目录时，当前图片之后保持的已遍历图片数量
+        self.recursive_browsing = False
+        self.recursive_lookahead = 500
+        self.metadata_generation = 0
         self.resize_timer = None
 
         # 对话框监控
@@ -293,17 +346,12 @@ class ImageViewer(
 
     def update_memory_limit(self):
         """更新内存限制"""
-        virtual_memory = psutil.virtual_memory()
-        self.cache_size_limit = int(virtual_memory.available * self.cache_ratio)
+        self.set_memory_budget(self.compute_memory_budget())
 
     def load_initial_image(self, initial_image):
         """加载初始图片"""
         directory = os.path.dirname(initial_image)
-        self.load_directory_images(directory)
-        try:
-            self.current_index = self.image_paths.index(initial_image)
-        except ValueError:
-            self.current_index = 0
+        self.load_directory_images(directory, initial_image)
         self.show_current_image()
 
     def adjust_window_size(self, img):
@@ -345,7 +393,10 @@ class ImageViewer(
         if self.dialog_monitor_thread.is_alive():
             self.dialog_monitor_thread.join(timeout=1.0)
 
-        # 释放图片缓存
+        # 停止目录监视和预加载并释放图片缓存
+        self.stop_watching_directory()
+        self.prefetch_pool.shutdown()
+        self.preview_refine_pool.shutdown()
         self.release_all_images()
 
         # 关闭所有对话框
@@ -6,6 +6,7 @@ Button and Menu Management Module - Updated Menu Items
 """
 
 import tkinter as tk
+from .directory_index import SORT_ORDERS
 
 
 class ButtonMixin:
@@ -28,6 +29,17 @@ class ButtonMixin:
         file_menu.add_command(label="重载内存", command=self.reload_memory)
         file_menu.add_command(label="调整缓存占空闲内存配比", command=self.adjust_cache_ratio)
         file_menu.add_command(label="图片列表", command=self.show_image_list)
+
+        # 排序方式子菜单
+        self.sort_order_var = tk.StringVar(value=self.sort_order)
+        sort_menu = tk.Menu(file_menu, tearoff=0)
+        for order, label in SORT_ORDERS.items():
+            sort_menu.add_radiobutton(label=label, value=order, variable=self.sort_order_var,
+                                      command=lambda order=order: self.set_sort_order(order))
+        file_menu.add_cascade(label="排序方式", menu=sort_menu)
+        self.recursive_browsing_var = tk.BooleanVar(value=self.recursive_browsing)
+        file_menu.add_checkbutton(label="递归浏览子目录", variable=self.recursive_browsing_var,
+                                  command=self.toggle_recursive_browsing)
         file_menu.add_separator()
         # 更新窗口相关菜单项
         file_menu.add_command(
@@ -70,6 +82,8 @@ class ButtonMixin:
         self.menubar.add_cascade(label="文件", menu=file_menu)
         self.menubar.add_command(label="上一张", command=lambda: self.navigate("prev"))
         self.menubar.add_command(label="下一张", command=lambda: self.navigate("next"))
+        self.menubar.add_command(label="上一个目录", command=lambda: self.navigate_folder("prev"))
+        self.menubar.add_command(label="下一个目录", command=lambda: self.navigate_folder("next"))
         self.menubar.add_cascade(label="播放控制", menu=play_menu)
         self.menubar.add_cascade(label="图片", menu=image_menu)
         self.menubar.add_cascade(label="帮助", menu=help_menu)
@@ -94,15 +108,10 @@ class ButtonMixin:
 
         if directory == self.last_directory and self.image_paths:
             try:
-                self.current_index = self.image_paths.index(file_path)
+                index = self.directory_index.position(file_path)
             except ValueError:
-                self.current_index = 0
-            self.show_current_image()
+                index = 0
+            self.jump_to_index(index)
         else:
-            self.last_directory = directory
-            self.load_directory_images(directory)
-            try:
-                self.current_index = self.image_paths.index(file_path)
-            except ValueError:
-                self.current_index = 0
+            self.load_directory_images(directory, file_path)
             self.show_current_image()
\ No newline at end of file
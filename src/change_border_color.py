@@ -23,17 +23,18 @@ class BorderColorMixin:
         img, _ = img_data
 
         def compute_dominant_color():
-            # 提取边缘像素
+            # 提取边缘像素，缓存图片可能是灰度或调色板模式，逐条边转换为RGB
             width, height = img.size
             edge_pixels = []
-            for x in range(width):  # 上边缘
-                edge_pixels.append(img.getpixel((x, 0)))
-            for x in range(width):  # 下边缘
-                edge_pixels.append(img.getpixel((x, height - 1)))
-            for y in range(height):  # 左边缘
-                edge_pixels.append(img.getpixel((0, y)))
-            for y in range(height):  # 右边缘
-                edge_pixels.append(img.getpixel((width - 1, y)))
+            edges = (
+                (0, 0, width, 1),  # 上边缘
+                (0, height - 1, width, height),  # 下边缘
+                (0, 0, 1, height),  # 左边缘
+                (width - 1, 0, width, height)  # 右边缘
+            )
+            for box in edges:
+                data = img.crop(box).convert('RGB').tobytes()
+                edge_pixels.extend(zip(data[0::3], data[1::3], data[2::3]))
 
             # 计算主导颜色
             color_counts = Counter(edge_pixels)
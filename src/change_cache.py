@@ -35,6 +35,7 @@ class ChangeCacheMixin:
         tk.Label(info_frame, text=f"缓存比例: {current_ratio:.2f}").pack(anchor=tk.W)
         tk.Label(info_frame, text=f"缓存限制: {self.format_memory(current_limit)}").pack(anchor=tk.W)
         tk.Label(info_frame, text=f"可用内存: {self.format_memory(virtual_memory.available)}").pack(anchor=tk.W)
+        tk.Label(info_frame, text=self.format_cache_stats()).pack(anchor=tk.W)
 
         # 输入框架
         input_frame = tk.Frame(dialog)
@@ -79,21 +80,18 @@ class ChangeCacheMixin:
 
                 # 更新缓存配置
                 self.cache_ratio = ratio
-                virtual_memory = psutil.virtual_memory()
-                self.cache_size_limit = int(virtual_memory.available * self.cache_ratio)
+                self.set_memory_budget(self.compute_memory_budget())
 
                 # 保存到配置文件
                 if hasattr(self, 'config_manager'):
                     self.config_manager.set_cache_ratio(ratio)
                     print(f"缓存配置已保存到: {self.config_manager.config_file}")
 
-                print(f"缓存比例设置为: {self.cache_ratio:.2f}, 缓存限制: {self.format_memory(self.cache_size_limit)}")
+                print(f"缓存比例设置为: {self.cache_ratio:.2f}, 缓存限制: {self.format_memory(self.get_memory_budget())}")
 
-                # 清空并重新加载缓存以应用新限制
-                self.release_all_images()
-                if self.image_paths and self.last_directory:
-                    self.load_directory_images(self.last_directory)
-                    self.show_current_image()
+                # 上限已原地调整，缩小时只淘汰了超出部分，按新预算重新规划预加载
+                if self.image_paths:
+                    self.schedule_prefetch(self.plan_prefetch())
 
                 dialog.destroy()
 
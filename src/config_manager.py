@@ -27,9 +27,17 @@ class ConfigManager:
         # 默认配置
         self.default_config = {
             'cache_ratio': 0.4,
+            'cache_policy': 'gdsf',  # 缓存淘汰策略：gdsf/lru
             'window_mode': 'dynamic',  # 'dynamic' 或 'fixed'
             'fixed_window_size': [800, 600],
-            'last_window_size': [1024, 768]
+            'last_window_size': [1024, 768],
+            'prefetch_ahead': 3,  # 浏览方向上的预加载数量
+            'prefetch_behind': 1,  # 反方向的预加载数量
+            'preview_cache_size_mb': 512,  # 磁盘预览缓存上限
+            'listing_cache_size_mb': 64,  # 持久化目录索引上限
+            'sort_order': 'name',  # 排序方式：name/mtime/size/dimensions/date
+            'recursive_browsing': False,  # 是否递归浏览子目录
+            'watch_rescan_interval': 300  # 轮询监视目录时完整重新列出的间隔（秒），0表示只在目录变化时列出
         }
 
         self.config = self.default_config.copy()
@@ -122,6 +130,14 @@ class ConfigManager:
         self.set('cache_ratio', ratio, auto_save=False)
         self.save_async(silent=True)  # 彻底静默
 
+    def get_cache_policy(self):
+        """获取缓存淘汰策略"""
+        return self.get('cache_policy', 'gdsf')
+
+    def set_cache_policy(self, policy):
+        """设置缓存淘汰策略"""
+        self.set('cache_policy', policy)
+
     def get_window_mode(self):
         """获取窗口模式"""
         return self.get('window_mode', 'dynamic')
@@ -149,6 +165,38 @@ class ConfigManager:
         """设置上次窗口尺寸"""
         self.set('last_window_size', [width, height])
 
+    def get_prefetch_window(self):
+        """获取预加载窗口 (前向数量, 后向数量)"""
+        return self.get('prefetch_ahead', 3), self.get('prefetch_behind', 1)
+
+    def get_preview_cache_size_mb(self):
+        """获取磁盘预览缓存上限（MB）"""
+        return self.get('preview_cache_size_mb', 512)
+
+    def get_listing_cache_size_mb(self):
+        """获取持久化目录索引上限（MB）"""
+        return self.get('listing_cache_size_mb', 64)
+
+    def get_sort_order(self):
+        """获取排序方式"""
+        return self.get('sort_order', 'name')
+
+    def set_sort_order(self, order):
+        """设置排序方式"""
+        self.set('sort_order', order)
+
+    def get_recursive_browsing(self):
+        """获取是否递归浏览子目录"""
+        return self.get('recursive_browsing', False)
+
+    def set_recursive_browsing(self, enabled):
+        """设置是否递归浏览子目录"""
+        self.set('recursive_browsing', enabled)
+
+    def get_watch_rescan_interval(self):
+        """获取轮询监视目录时完整重新列出的间隔（秒）"""
+        return self.get('watch_rescan_interval', 300)
+
     def get_config_dict(self):
         """获取完整配置字典"""
         return self.config.copy()
@@ -175,6 +223,15 @@ class ConfigMixin:
         # 应用缓存比例
         self.cache_ratio = self.config_manager.get_cache_ratio()
 
+        # 应用缓存淘汰策略
+        cache_policy = self.config_manager.get_cache_policy()
+        if not self.image_cache.set_policy(cache_policy):
+            print(f"未知的缓存淘汰策略 {cache_policy}，使用 {self.image_cache.policy}")
+
+        # 应用排序方式
+        self.sort_order = self.config_manager.get_sort_order()
+        self.recursive_browsing = self.config_manager.get_recursive_browsing()
+
         # 应用窗口模式
         window_mode = self.config_manager.get_window_mode()
         if window_mode == 'fixed':
@@ -183,12 +240,20 @@ class ConfigMixin:
         else:
             self.window_size_fixed = False
 
-        print(f"已应用配置: 缓存比例={self.cache_ratio:.2f}, 窗口模式={window_mode}")
+        print(f"已应用配置: 缓存比例={self.cache_ratio:.2f}, 淘汰策略={self.image_cache.policy}, 窗口模式={window_mode}")
 
     def save_cache_ratio_config(self, ratio):
         """保存缓存比例配置"""
         self.config_manager.set_cache_ratio(ratio)
 
+    def save_sort_order_config(self, order):
+        """保存排序方式配置"""
+        self.config_manager.set_sort_order(order)
+
+    def save_recursive_browsing_config(self, enabled):
+        """保存递归浏览配置"""
+        self.config_manager.set_recursive_browsing(enabled)
+
     def save_window_mode_config(self, mode):
         """保存窗口模式配置"""
         self.config_manager.set_window_mode(mode)
@@ -205,6 +270,7 @@ class ConfigMixin:
         return {
             'config_file': self.config_manager.config_file,
             'cache_ratio': self.config_manager.get_cache_ratio(),
+            'cache_policy': self.config_manager.get_cache_policy(),
             'window_mode': self.config_manager.get_window_mode(),
             'fixed_window_size': self.config_manager.get_fixed_window_size(),
             'last_window_size': self.config_manager.get_last_window_size()
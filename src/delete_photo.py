@@ -35,18 +35,15 @@ class DeletePhotoMixin:
 
         try:
             # 从内存缓存中移除图片
-            if current_path in self.image_cache:
-                img, size = self.image_cache.pop(current_path)
-                img.close()  # 释放图片资源
-                del self.lru_list[current_path]  # 从LRU列表中移除
-                self.current_cache_size -= size  # 更新当前缓存大小
+            self.image_cache.remove(current_path)
+            self.encoded_cache.remove(current_path)
 
             # 从文件系统中删除文件
             os.remove(current_path)
             print(f"已删除: {current_path}")
 
-            # 更新图片路径列表
-            del self.image_paths[self.current_index]
+            # 更新目录索引
+            self.directory_index.remove(current_path)
 
             # 如果删除后没有图片了，清空画布并更新标题
             if not self.image_paths:
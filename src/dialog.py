@@ -1,109 +1,394 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 """
-对话框管理功能模块
-Dialog Management Functionality Module
+图片加载功能模块
+Image Loading Functionality Module
 """
 
+import io
 import os
+import time
 import threading
-import tkinter as tk
-from tkinter import ttk
+import psutil
+from .tile_store import TileStore
+from .image_cache import ImageCache, probe_image, release_source, storage_mode, resample_mode
 
 
-class DialogMixin:
-    """对话框管理功能混合类"""
+def _jpeg_draft_scale(factor):
+    """JPEG解码时DCT缩放支持的最大倍数（1、2、4、8）"""
+    scale = 1
+    while scale < 8 and scale * 2 <= factor:
+        scale *= 2
+    return scale
+
 
-    def show_loading_dialog(self):
-        """显示加载进度对话框"""
-        self.loading_dialog = tk.Toplevel(self.root)
-        self.loading_dialog.title("正在加载...")
-        self.loading_dialog.transient(self.root)
-        self.loading_dialog.grab_set()
+def _replace_image(old, new):
+    """释放中间结果，只保留新生成的图片"""
+    old.close()
+    return new
 
-        self.progress = ttk.Progressbar(self.loading_dialog, length=300, mode='determinate')
-        self.progress.pack(padx=20, pady=10)
 
-        self.loading_label = tk.Label(self.loading_dialog, text="正在加载图片，请稍候...")
-        self.loading_label.pack(pady=5)
+class DialogMixin:
+    """图片加载功能混合类 - 解码、准入控制和后台预热"""
 
-        self.current_image_label = tk.Label(self.loading_dialog, text="当前加载: 无", wraplength=300)
-        self.current_image_label.pack(pady=5)
+    def start_background_warming(self):
+        """在后台预热当前目录的图片，不阻塞界面，进度显示在状态栏"""
+        self.loading_generation += 1
+        self.loading_active = True
+        threading.Thread(target=self.async_load_images, args=(self.loading_generation,), daemon=True).start()
 
     def update_progress(self, loaded, total):
-        """更新加载进度"""
-        if self.loading_dialog.winfo_exists():
-            self.progress['value'] = (loaded / total) * 100
-            self.loading_label.config(
-                text=f"已加载 {loaded}/{total} 张图片 内存：({self.format_memory(self.current_cache_size)} / {self.format_memory(self.cache_size_limit)})"
+        """在状态栏显示后台预热进度"""
+        print(
+            f"后台加载 {loaded}/{total} 张图片 内存：({self.format_memory(self.image_cache.current_size)}"
+            f" / {self.format_memory(self.image_cache.limit)})"
+        )
+
+    def async_load_images(self, generation):
+        """
+        后台预热图片：按与当前图片的距离由近及远加载，当前图片移动后重新排序
+        缓存只能靠淘汰本轮预热的图片腾出空间时停止，切换目录或跳转后由新一轮取代
+
+        Args:
+            generation: 启动时的预热批次，与当前批次不一致时退出
+        """
+        # 本轮已尝试的路径，和已在缓存中、不允许为预热腾空间而淘汰的路径
+        attempted = set()
+        warmed = set()
+        self.warmed_paths = warmed
+        center = None
+        order = iter(())
+        reported = 0
+
+        while self.loading_active and generation == self.loading_generation:
+            paths = self.image_paths
+            total = len(paths)
+            if self.current_index != center:
+                center = self.current_index
+                order = self.prefetch_planner.warming_order(center, total)
+
+            path = next((paths[idx] for idx in order if idx < len(paths) and paths[idx] not in attempted), None)
+            if path is None:
+                break
+            attempted.add(path)
+
+            if path not in self.image_cache:
+                if not self.image_cache.make_room(self.image_cache.average_entry_size(), protect=warmed):
+                    self.root.after(0, print, f"缓存已满，后台加载暂停于 {len(warmed)}/{total} 张图片")
+                    return
+                # 解码前腾空间和放入缓存时同样不淘汰本轮已预热的图片
+                if not self.load_image_to_cache(path, protect=warmed):
+                    continue
+            warmed.add(path)
+
+            # 状态栏进度约每5%刷新一次
+            if len(warmed) - reported >= max(1, total // 20):
+                reported = len(warmed)
+                self.root.after(0, self.update_progress, reported, total)
+
+        if generation == self.loading_generation:
+            self.root.after(0, self.update_progress, len(warmed), len(self.image_paths))
+
+    def load_image_to_cache(self, path, protect=(), write_tiles=True):
+        """
+        加载图片到缓存（同一路径的并发请求只解码一次），按显示分辨率解码
+
+        Args:
+            path: 图片路径
+            protect: 为这张图片腾空间时不允许淘汰的路径集合
+            write_tiles: 超大图片是否在当前线程接着写入瓦片，为False时由调用方调用 write_pending_tiles
+        """
+        # 解码函数在单飞加载中执行，不能调用Tk（包括输出到状态栏），
+        # 否则界面线程等待同一路径时两边互相等待；提示在 load() 返回后输出
+        try:
+            loaded = self.image_cache.load(path, lambda p: self._decode_display_image(p, protect), protect)
+        except Exception as e:
+            self.decode_notices.pop(path, None)
+            self.report_status(f"无法加载图片 {path}: {e}")
+            loaded = False
+        notice = self.decode_notices.pop(path, None)
+        if notice:
+            self.report_status(notice)
+
+        if loaded and path in self.preview_placeholders and self.image_cache.is_pinned(path):
+            # 只为当前图片和预加载窗口中的占位预览图按原文件重新解码
+            self.preview_refine_pool.submit(path, -1, 0)
+        if write_tiles:
+            self.write_pending_tiles(path)
+        return loaded
+
+    def report_status(self, message):
+        """在状态栏输出消息，后台线程中交给界面线程输出"""
+        if threading.current_thread() is threading.main_thread():
+            print(message)
+        else:
+            self.root.after(0, print, message)
+
+    def load_in_background(self, path):
+        """在后台线程加载图片，完成后若仍是当前图片则显示（超大图片先显示概览图再写瓦片），界面线程不等待解码"""
+        if path in self.background_loads:
+            return
+        self.background_loads.add(path)
+
+        def load():
+            self.load_image_to_cache(path, write_tiles=False)
+            self.root.after(0, self._show_background_load, path)
+            self.write_pending_tiles(path)
+
+        threading.Thread(target=load, daemon=True).start()
+
+    def _show_background_load(self, path):
+        """后台加载完成后显示仍为当前图片的结果"""
+        self.background_loads.discard(path)
+        if self.image_paths and self.image_paths[self.current_index] == path and path in self.image_cache:
+            self.show_current_image()
+
+    def needs_tiles(self, path):
+        """图片是否超过瓦片模式的像素数，需要在后台解码并切瓦片"""
+        try:
+            width, height = probe_image(path).size
+        except Exception:
+            return False
+        return width * height > self.tile_pixel_threshold
+
+    def write_pending_tiles(self, path):
+        """
+        在当前（后台）线程把已解码的超大图片写入瓦片，完成后挂接到缓存中的概览图
+        写入期间记为等待原图，放大时不会重复解码
+        """
+        source = self.tile_sources.pop(path, None)
+        if source is None:
+            return
+        entry = self.image_cache.get_entry(path)
+        if entry is None:
+            source.close()
+            return
+        self.full_resolution_pending.add(path)
+        try:
+            store = TileStore.from_image(source, self.tile_memory_budget())
+        except Exception as e:
+            self.report_status(f"无法写入瓦片 {path}: {e}")
+            self.root.after(0, self.full_resolution_pending.discard, path)
+            return
+        self.root.after(0, self._apply_full_resolution_tiles, path, entry, store)
+
+    def _decode_display_image(self, path, protect=()):
+        """
+        按当前显示目标尺寸解码图片，超大图片先返回概览图，由调用方在后台切成瓦片存入磁盘
+        磁盘预览缓存命中时先以预览图（JPEG重新编码）占位，随后在后台按原文件解码替换
+        文件字节在二级缓存中时直接从内存解码
+        解码前根据文件头预测内存占用，决定缩小倍数并预先腾出缓存空间
+
+        Returns:
+            tuple: (图片, 原图尺寸, None)，超大图片的瓦片由 write_pending_tiles 挂接
+        """
+        data = self.encoded_cache.get(path)
+        probe = probe_image(io.BytesIO(data) if data is not None else path)
+        width, height = probe.size
+
+        target_size = self.display_target_size
+        if width * height > self.tile_pixel_threshold:
+            # 切瓦片需要完整解码一次
+            tile_mode = 'L' if probe.mode in ('1', 'L') else 'RGB'
+            self._check_transient_size(path, ImageCache.predict_size(tile_mode, probe.size))
+            source = TileStore.decode(path)
+            try:
+                overview = TileStore.make_overview(
+                    source, target_size or (2048, 2048), int(self.image_cache.limit * 0.5) - self.tile_memory_budget()
+                )
+            except Exception:
+                source.close()
+                raise
+            self.tile_sources[path] = source
+            return overview, (width, height), None
+
+        preview = self.preview_cache.get_preview(path)
+        if preview is not None:
+            fit = 1.0
+            if target_size:
+                fit = min(1.0, target_size[0] / width, target_size[1] / height)
+            if preview.width >= int(width * fit) - 1 and preview.height >= int(height * fit) - 1:
+                self.preview_placeholders[path] = preview
+                return preview, (width, height), None
+            preview.close()
+
+        source = io.BytesIO(data) if data is not None else None
+        img, full_size = self._decode_display_resolution(path, probe, source, protect)
+        if img.size != full_size:
+            self.preview_cache.put_preview(path, img)
+        return img, full_size, None
+
+    def _decode_display_resolution(self, path, probe, source=None, protect=(), replacing=0):
+        """
+        按显示目标尺寸从原文件解码，解码前预先腾出缓存空间，protect 中的路径不会被淘汰
+        replacing 为解码结果将替换的缓存项大小，替换后释放，不必另外腾出
+        source 为空时由 open_image_source 决定从文件字节还是按路径解码
+        """
+        factor, predicted, notice = self._plan_decode(
+            path, probe, self._decode_factor(probe.size, self.display_target_size)
+        )
+        if notice:
+            self.decode_notices[path] = notice
+        self.image_cache.make_room(max(0, predicted - replacing), protect=protect)
+
+        if source is None:
+            source = self.open_image_source(path)
+        return self._decode_image(source, factor=factor)
+
+    def _refine_preview(self, path):
+        """
+        后台任务：按原文件解码，替换作为占位的预览图
+        执行时已不在预加载窗口中的图片保留占位，再次进入窗口时重新安排
+        """
+        preview = self.preview_placeholders.get(path)
+        entry = self.image_cache.get_entry(path)
+        if preview is None or entry is None or entry.image is not preview:
+            self.preview_placeholders.pop(path, None)
+            return
+        if not self.image_cache.is_pinned(path):
+            return
+        self.preview_placeholders.pop(path, None)
+        try:
+            start = time.monotonic()
+            source = self.open_image_source(path)
+            img, full_size = self._decode_display_resolution(
+                path, probe_image(source), source, self.warmed_paths, entry.size
             )
+            cost = time.monotonic() - start
+        except Exception as e:
+            self.decode_notices.pop(path, None)
+            self.report_status(f"无法加载图片 {path}: {e}")
+            return
+        notice = self.decode_notices.pop(path, None)
+        if notice:
+            self.report_status(notice)
+        self.root.after(0, self._apply_refined_preview, path, preview, img, full_size, cost)
+
+    def _apply_refined_preview(self, path, preview, img, full_size, cost):
+        """用原文件解码结果替换预览图并记录实际解码耗时，预览图已被淘汰或修改（旋转、翻转）时放弃"""
+        entry = self.image_cache.get_entry(path)
+        if entry is None or entry.image is not preview:
+            img.close()
+            return
+        self.image_cache.replace(path, img, full_size, cost=cost)
+        if self.image_paths and self.image_paths[self.current_index] == path:
+            self.high_quality_redraw()
+
+    def _plan_decode(self, path, probe, factor):
+        """
+        根据文件头预测解码后的大小，超出单张上限时加大缩小倍数
+
+        Args:
+            path: 图片路径
+            probe: 图片头信息
+            factor: 按显示尺寸确定的缩小倍数
 
-    def close_loading_dialog(self):
-        """关闭加载对话框"""
-        if self.loading_dialog.winfo_exists():
-            self.loading_dialog.grab_release()
-            self.loading_dialog.destroy()
-
-    def update_current_image_label(self, filename, size):
-        """更新当前加载图片标签"""
-        if self.loading_dialog.winfo_exists():
-            self.current_image_label.config(
-                text=f"当前加载: {filename} ({self.format_memory(size)})"
+        Returns:
+            tuple: (缩小倍数, 预测大小, 降低分辨率的提示或None)，提示由调用方在单飞加载之外输出
+        """
+        max_size = self.image_cache.limit * 0.5
+        width, height = probe.size
+        planned = factor
+        predicted = self._predict_decoded_size(probe, planned)
+        while predicted > max_size and min(width, height) // planned > 1:
+            planned *= 2
+            predicted = self._predict_decoded_size(probe, planned)
+
+        name = os.path.basename(path)
+        if predicted > max_size:
+            raise MemoryError(f"{name} 解码后约 {self.format_memory(predicted)}，超出单张缓存上限，拒绝加载")
+
+        # 除JPEG外，缩小前需要完整解码，必要时还要展开调色板
+        if probe.format != 'JPEG':
+            transient = ImageCache.predict_size(probe.mode, probe.size)
+            mode = resample_mode(probe)
+            if planned > 1 and mode != probe.mode:
+                transient += ImageCache.predict_size(mode, probe.size)
+            self._check_transient_size(path, transient)
+
+        notice = None
+        if planned != factor:
+            notice = (f"{name} ({width}x{height}) 超出单张缓存上限，按 1/{planned} 分辨率加载"
+                      f"（约 {self.format_memory(predicted)}）")
+        return planned, predicted, notice
+
+    def _check_transient_size(self, path, size):
+        """
+        解码过程中的临时占用超过可用内存的一半时拒绝加载
+        临时占用解码后立即释放，不受缓存比例限制，过小的缓存比例也不影响超大图片显示
+        """
+        available = psutil.virtual_memory().available
+        if size > available * 0.5:
+            raise MemoryError(
+                f"{os.path.basename(path)} 完整解码约需 {self.format_memory(size)}，"
+                f"超出可用内存 {self.format_memory(available)} 的一半，拒绝加载"
             )
 
-    def async_load_images(self):
-        """异步加载图片"""
-        total = len(self.image_paths)
-        loaded = 0
-        priority_indices = set(range(0, 3)) | set(range(len(self.image_paths) - 3, len(self.image_paths)))
-
-        for idx in priority_indices:
-            if 0 <= idx < len(self.image_paths) and self.loading_active:
-                path = self.image_paths[idx]
-                file_size = os.path.getsize(path)
-                self.root.after(0, self.update_current_image_label, os.path.basename(path), file_size)
-                if self.load_image_to_cache(path):
-                    loaded += 1
-                    self.root.after(0, self.update_progress, loaded, total)
-
-        for idx, path in enumerate(self.image_paths):
-            if idx not in priority_indices and self.loading_active:
-                file_size = os.path.getsize(path)
-                self.root.after(0, self.update_current_image_label, os.path.basename(path), file_size)
-                if self.load_image_to_cache(path):
-                    loaded += 1
-                    self.root.after(0, self.update_progress, loaded, total)
-
-        self.root.after(0, self.close_loading_dialog)
-        self.root.after(0, self.enable_navigation)
-
-    def load_image_to_cache(self, path):
-        """加载图片到缓存"""
-        if path in self.image_cache:
-            return True
+    def tile_memory_budget(self):
+        """瓦片存储在内存中缓存瓦片的上限，不超过缓存上限的四分之一"""
+        return min(64 * 1024 * 1024, int(self.image_cache.limit * 0.25))
+
+    @staticmethod
+    def _decode_factor(full_size, target_size):
+        """铺满目标区域所需的整数缩小倍数，缩小不到一半时按原图解码"""
+        if not target_size:
+            return 1
+        scale = min(target_size[0] / full_size[0], target_size[1] / full_size[1])
+        return int(1 / scale) if scale < 0.5 else 1
+
+    @staticmethod
+    def _predict_decoded_size(probe, factor):
+        """按 _decode_image 的解码方式预测缓存图片的大小，缩小前转换模式的图片按转换后的模式计算"""
+        width, height = probe.size
+        mode = probe.mode
+        if factor > 1 and probe.format == 'JPEG':
+            scale = _jpeg_draft_scale(factor)
+            width, height = -(-width // scale), -(-height // scale)
+            factor //= scale
+        elif factor > 1:
+            mode = resample_mode(probe)
+        if factor > 1:
+            width, height = -(-width // factor), -(-height // factor)
+        return ImageCache.predict_size(storage_mode(probe._replace(mode=mode)), (width, height))
+
+    @classmethod
+    def _decode_image(cls, path, target_size=None, factor=None):
+        """
+        解码图片文件，紧凑模式（二值、灰度、调色板、带透明通道）保持原始模式
+
+        Args:
+            path: 图片路径或文件对象
+            target_size: 显示目标尺寸 (宽, 高)，为None时按原图解码
+            factor: 缩小倍数，指定时忽略 target_size
+
+        Returns:
+            tuple: (图片, 原图尺寸)，图片直接使用解码缓冲区，不再额外复制
+        """
+        from PIL import Image
+        img = Image.open(path)
         try:
-            from PIL import Image
-            with Image.open(path) as img:
-                img = img.convert('RGB')
-                width, height = img.size
-                channels = 3
-                bytes_per_pixel = 1
-                img_size = width * height * channels * bytes_per_pixel
-
-                if img_size > self.cache_size_limit * 0.5:
-                    return False
-
-                while self.current_cache_size + img_size > self.cache_size_limit and self.lru_list:
-                    self.remove_oldest_image()
-
-                if self.current_cache_size + img_size > self.cache_size_limit:
-                    return False
-
-                self.image_cache[path] = (img.copy(), img_size)
-                self.lru_list[path] = True
-                self.lru_list.move_to_end(path)
-                self.current_cache_size += img_size
-                return True
-        except Exception as e:
-            print(f"无法加载图片 {path}: {e}")
-            return False
\ No newline at end of file
+            full_size = img.size
+            if factor is None:
+                factor = cls._decode_factor(full_size, target_size)
+
+            if factor > 1 and img.format == 'JPEG':
+                # JPEG使用DCT缩放，解码时直接得到不小于请求尺寸的图片，不足部分再缩小
+                scale = _jpeg_draft_scale(factor)
+                img.draft(img.mode, (-(-full_size[0] // scale), -(-full_size[1] // scale)))
+                factor //= scale
+            elif factor > 1:
+                mode = resample_mode(img)
+                if mode != img.mode:
+                    img = _replace_image(img, img.convert(mode))
+            if factor > 1:
+                img = _replace_image(img, img.reduce(factor))
+
+            img.load()
+            release_source(img)
+            mode = storage_mode(img)
+            if mode != img.mode:
+                img = _replace_image(img, img.convert(mode))
+            return img, full_size
+        except Exception:
+            img.close()
+            raise
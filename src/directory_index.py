@@ -0,0 +1,360 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录图片索引模块
+Directory Image Index Module
+"""
+
+import os
+import re
+import time
+import bisect
+from PIL import Image
+
+# 支持的图片扩展名
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.gif', '.webp', '.tiff')
+
+# 排序方式 -> 菜单显示名称
+ORDER_NAME = 'name'
+ORDER_MTIME = 'mtime'
+ORDER_SIZE = 'size'
+ORDER_DIMENSIONS = 'dimensions'
+ORDER_DATE = 'date'
+SORT_ORDERS = {
+    ORDER_NAME: '文件名',
+    ORDER_MTIME: '修改时间',
+    ORDER_SIZE: '文件大小',
+    ORDER_DIMENSIONS: '图片尺寸',
+    ORDER_DATE: '拍摄日期'
+}
+# 需要读取图片头部信息的排序方式
+METADATA_ORDERS = (ORDER_DIMENSIONS, ORDER_DATE)
+
+_DIGITS = re.compile(r'(\d+)')
+
+# EXIF标签编号：Exif子IFD、拍摄时间、修改时间（ExifTags.IFD/ExifTags.Base 需要 Pillow 9.4 以上）
+_EXIF_IFD = 0x8769
+_EXIF_DATETIME_ORIGINAL = 0x9003
+_EXIF_DATETIME = 0x0132
+
+
+def natural_sort_key(s):
+    """自然排序键，数字段按数值比较；返回元组以便长期保存在索引中"""
+    parts = _DIGITS.split(s.lower())
+    parts[1::2] = map(int, parts[1::2])
+    return tuple(parts)
+
+
+def is_image_file(name):
+    """根据扩展名判断是否为支持的图片"""
+    return os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS
+
+
+def is_image_entry(entry):
+    """判断 os.scandir 条目是否为图片文件，使用条目自带的类型信息，不额外访问文件系统"""
+    try:
+        return is_image_file(entry.name) and entry.is_file()
+    except OSError:
+        return False
+
+
+def walk_images(directory, recursive=False):
+    """
+    按需遍历目录中的图片，生成 (路径, stat结果)
+    递归时按深度优先遍历，同级的文件和子目录按自然顺序交替，子目录轮到时才读取
+
+    Args:
+        directory: 目录路径
+        recursive: 是否包含子目录
+    """
+    try:
+        scanner = os.scandir(directory)
+    except OSError as e:
+        print(f"无法读取目录 {directory}: {e}")
+        return
+
+    with scanner:
+        if not recursive:
+            for entry in scanner:
+                if not is_image_entry(entry):
+                    continue
+                try:
+                    # Windows上条目自带stat结果，不会再次访问文件系统
+                    yield os.path.normpath(entry.path), entry.stat()
+                except OSError:
+                    continue
+            return
+        entries = sorted(scanner, key=lambda entry: natural_sort_key(entry.name))
+
+    for entry in entries:
+        try:
+            if entry.is_dir(follow_symlinks=False):
+                yield from walk_images(entry.path, True)
+                continue
+            if is_image_entry(entry):
+                yield os.path.normpath(entry.path), entry.stat()
+        except OSError:
+            continue
+
+
+def compact_stat(stat):
+    """将 stat 结果压缩为 (文件大小, 修改时间纳秒)"""
+    return stat.st_size, stat.st_mtime_ns
+
+
+def probe_metadata(path):
+    """
+    只读取图片头部，获取尺寸和EXIF拍摄日期
+
+    Returns:
+        tuple: (宽, 高, 拍摄日期)，拍摄日期为 'YYYY:MM:DD HH:MM:SS' 格式，没有时为空字符串
+    """
+    with Image.open(path) as img:
+        width, height = img.size
+        date = ''
+        try:
+            exif = img.getexif()
+            date = exif.get_ifd(_EXIF_IFD).get(_EXIF_DATETIME_ORIGINAL) or exif.get(_EXIF_DATETIME) or ''
+        except Exception:
+            pass
+    if not isinstance(date, str):
+        date = ''
+    return width, height, date.strip('\x00 ')
+
+
+class DirectoryIndex:
+    """目录图片索引 - 保存有序的图片路径和预先计算的排序键，支持分批合并和多种排序方式"""
+
+    def __init__(self, directory, order=ORDER_NAME, recursive=False):
+        """
+        初始化目录索引
+
+        Args:
+            directory: 目录路径
+            order: 排序方式，SORT_ORDERS 中的键
+            recursive: 是否包含子目录中的图片
+        """
+        self.directory = directory
+        self.order = order if order in SORT_ORDERS else ORDER_NAME
+        self.recursive = recursive
+        # 目录是否已完整扫描，未完成时列表末尾并不是目录的末尾
+        self.complete = False
+        # 计算相对路径用的前缀
+        self._prefix = os.path.join(os.path.normpath(directory), '')
+        # 索引内容对应的目录修改时间，用于判断持久化的索引是否过期
+        self.dir_mtime_ns = None
+        # 有序的图片路径，作为查看器的 image_paths 使用，只在原列表上修改
+        self.paths = []
+        # 与 paths 一一对应的排序键 (主键, 自然排序键, 路径)
+        self._keys = []
+        # 路径 -> 相对路径各部分的自然排序键，子目录中的图片按目录名参与排序
+        self._names = {}
+        # 路径 -> (文件大小, 修改时间纳秒)，未知时为None
+        self.stats = {}
+        # 路径 -> (宽, 高, 拍摄日期)，只保存已读取过头部的图片
+        self.metadata = {}
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __contains__(self, path):
+        return path in self.stats
+
+    def relative_path(self, path):
+        """路径相对于索引目录的部分"""
+        if path.startswith(self._prefix):
+            return path[len(self._prefix):]
+        return os.path.relpath(path, self.directory)
+
+    def covers(self, path):
+        """路径是否属于索引范围：目录中的图片，递归时也包括子目录中的图片"""
+        relative = self.relative_path(path)
+        return not relative.startswith(os.pardir) and (self.recursive or os.sep not in relative)
+
+    def _name_key(self, path):
+        """相对路径各部分的自然排序键"""
+        return tuple(natural_sort_key(part) for part in self.relative_path(path).split(os.sep))
+
+    def _sort_key(self, path):
+        """按当前排序方式计算排序键"""
+        name = self._names[path]
+        if self.order == ORDER_NAME:
+            return (), name, path
+
+        stat = self.stats.get(path)
+        size, mtime_ns = stat if stat else (-1, -1)
+        if self.order == ORDER_MTIME:
+            return mtime_ns, name, path
+        if self.order == ORDER_SIZE:
+            return size, name, path
+
+        meta = self.metadata.get(path)
+        if self.order == ORDER_DIMENSIONS:
+            return (meta[0] * meta[1] if meta else -1), name, path
+        # 没有EXIF拍摄日期时按修改时间，格式与EXIF一致以便直接比较
+        date = meta[2] if meta else ''
+        if not date and mtime_ns >= 0:
+            date = time.strftime('%Y:%m:%d %H:%M:%S', time.localtime(mtime_ns / 1e9))
+        return date, name, path
+
+    def add(self, entries):
+        """
+        合并一批条目，已存在的路径会被忽略
+
+        Args:
+            entries: [(路径, stat结果或None)]
+
+        Returns:
+            int: 新增数量
+        """
+        new_keys = []
+        for path, stat in entries:
+            if path in self.stats:
+                continue
+            self.stats[path] = compact_stat(stat) if stat is not None else None
+            self._names[path] = self._name_key(path)
+            new_keys.append(self._sort_key(path))
+        if not new_keys:
+            return 0
+
+        # 两段有序序列拼接后排序，Timsort按归并处理，开销与总数成线性
+        new_keys.sort()
+        merged = self._keys + new_keys
+        merged.sort()
+        self._set_keys(merged)
+        return len(new_keys)
+
+    def load_entries(self, entries):
+        """
+        从持久化的条目恢复索引，只排序一次
+
+        Args:
+            entries: [(相对路径, 文件大小, 修改时间纳秒, 宽, 高, 拍摄日期)]，未读取头部时宽为None
+        """
+        for name, size, mtime_ns, width, height, date in entries:
+            path = os.path.normpath(os.path.join(self.directory, name))
+            self.stats[path] = (size, mtime_ns)
+            self._names[path] = self._name_key(path)
+            if width is not None:
+                self.metadata[path] = (width, height, date)
+        self._set_keys(sorted(self._sort_key(path) for path in self.stats))
+
+    def export_entries(self):
+        """导出可持久化的条目，格式与 load_entries 相同"""
+        entries = []
+        for path in self.paths:
+            size, mtime_ns = self.stats[path] or (-1, -1)
+            width, height, date = self.metadata.get(path, (None, None, None))
+            entries.append((self.relative_path(path), size, mtime_ns, width, height, date))
+        return entries
+
+    def _set_keys(self, keys):
+        """替换排序键并同步路径列表"""
+        self._keys[:] = keys
+        self.paths[:] = [key[2] for key in keys]
+
+    def set_order(self, order):
+        """
+        切换排序方式，只使用索引中已有的信息，不访问文件
+
+        Returns:
+            bool: 排序方式是否改变
+        """
+        if order not in SORT_ORDERS or order == self.order:
+            return False
+        self.order = order
+        self._set_keys(sorted(self._sort_key(path) for path in self.paths))
+        return True
+
+    def missing_metadata(self):
+        """尚未读取头部信息的图片路径，按当前顺序"""
+        return [path for path in self.paths if path not in self.metadata]
+
+    def update_metadata(self, items):
+        """
+        记录一批图片的头部信息，当前排序依赖这些信息时移动到新位置
+
+        Args:
+            items: [(路径, (宽, 高, 拍摄日期))]
+
+        Returns:
+            bool: 顺序是否可能改变
+        """
+        resort = self.order in METADATA_ORDERS
+        for path, meta in items:
+            if path not in self.stats:
+                continue
+            if not resort:
+                self.metadata[path] = meta
+                continue
+            idx = self.position(path)
+            del self._keys[idx]
+            del self.paths[idx]
+            self.metadata[path] = meta
+            self._insert(path)
+        return resort
+
+    def update_stat(self, path, stat):
+        """更新文件的 stat 信息，内容变化后旧的头部信息同时作废"""
+        if path not in self.stats:
+            return
+        idx = self.position(path)
+        del self._keys[idx]
+        del self.paths[idx]
+        self.stats[path] = compact_stat(stat)
+        self.metadata.pop(path, None)
+        self._insert(path)
+
+    def _insert(self, path):
+        """按排序键二分插入，返回插入位置"""
+        key = self._sort_key(path)
+        idx = bisect.bisect_left(self._keys, key)
+        self._keys.insert(idx, key)
+        self.paths.insert(idx, path)
+        return idx
+
+    def position(self, path):
+        """
+        查找路径在索引中的位置
+
+        Raises:
+            ValueError: 路径不在索引中
+        """
+        if path not in self.stats:
+            raise ValueError(f"{path} 不在目录索引中")
+        key = self._sort_key(path)
+        idx = bisect.bisect_left(self._keys, key)
+        if idx < len(self._keys) and self._keys[idx] == key:
+            return idx
+        raise ValueError(f"{path} 不在目录索引中")
+
+    def remove(self, path):
+        """
+        移除路径
+
+        Returns:
+            int: 被移除路径原来的位置
+        """
+        idx = self.position(path)
+        del self._keys[idx]
+        del self.paths[idx]
+        del self.stats[path]
+        del self._names[path]
+        self.metadata.pop(path, None)
+        return idx
+
+    def rename(self, old_path, new_path):
+        """
+        重命名路径并移动到新名称对应的位置，文件信息随之保留
+
+        Returns:
+            int: 新位置
+        """
+        stat = self.stats[old_path]
+        meta = self.metadata.get(old_path)
+        self.remove(old_path)
+        self.stats[new_path] = stat
+        self._names[new_path] = self._name_key(new_path)
+        if meta is not None:
+            self.metadata[new_path] = meta
+        return self._insert(new_path)
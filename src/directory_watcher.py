@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+目录监视功能模块
+Directory Watching Functionality Module
+"""
+
+import os
+import sys
+import time
+import select
+import struct
+import threading
+from .directory_index import is_image_file, is_image_entry, compact_stat
+
+# 变化类型
+CHANGE_ADDED = 'added'
+CHANGE_REMOVED = 'removed'
+CHANGE_MODIFIED = 'modified'
+# 监视器无法得知具体变化（如事件队列溢出）时发送整个目录的快照
+CHANGE_SNAPSHOT = 'snapshot'
+
+
+def snapshot_directory(directory):
+    """
+    读取目录中所有图片的 (文件大小, 修改时间纳秒)
+
+    Returns:
+        dict: 路径 -> (文件大小, 修改时间纳秒)
+    """
+    snapshot = {}
+    with os.scandir(directory) as scanner:
+        for entry in scanner:
+            if not is_image_entry(entry):
+                continue
+            try:
+                snapshot[os.path.normpath(entry.path)] = compact_stat(entry.stat())
+            except OSError:
+                continue
+    return snapshot
+
+
+class DirectoryWatcher:
+    """目录监视器基类 - 在后台线程中检测图片文件变化，合并短时间内的多次变化后回调"""
+
+    # 收到变化后等待更多变化的时间，相机连拍时合并为一批
+    settle_delay = 0.1
+
+    def __init__(self, directory, callback):
+        """
+        初始化目录监视器
+
+        Args:
+            directory: 目录路径
+            callback: 在监视线程中调用，参数为 [(变化类型, 路径)]，快照的路径参数为快照字典
+        """
+        self.directory = directory
+        self.callback = callback
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """启动监视线程"""
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """停止监视"""
+        self._stop.set()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _emit(self, changes):
+        """同一路径只保留最后一次变化后回调"""
+        merged = {}
+        for kind, path in changes:
+            if kind == CHANGE_SNAPSHOT:
+                self.callback([(kind, path)])
+                merged.clear()
+                continue
+            if kind == CHANGE_MODIFIED and merged.get(path) == CHANGE_ADDED:
+                continue
+            merged[path] = kind
+        if merged and not self._stop.is_set():
+            self.callback([(kind, path) for path, kind in merged.items()])
+
+
+class InotifyWatcher(DirectoryWatcher):
+    """Linux inotify 目录监视器 - 文件写完关闭、移入移出和删除时由内核通知"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_DELETE = 0x00000200
+    IN_Q_OVERFLOW = 0x00004000
+    IN_ISDIR = 0x40000000
+    WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE
+    EVENT_HEADER = struct.Struct('iIII')
+
+    def __init__(self, directory, callback):
+        super().__init__(directory, callback)
+        import ctypes
+        import ctypes.util
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        if libc.inotify_add_watch(self._fd, os.fsencode(directory), self.WATCH_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, f"无法监视目录 {directory}")
+
+    def _run(self):
+        try:
+            while not self._stop.is_set():
+                if not select.select([self._fd], [], [], 0.5)[0]:
+                    continue
+                changes = self._read_events()
+                # 短暂等待，把连续到达的事件合并为一批
+                while select.select([self._fd], [], [], self.settle_delay)[0]:
+                    changes.extend(self._read_events())
+                self._emit(changes)
+        finally:
+            os.close(self._fd)
+
+    def _read_events(self):
+        """读取并解析当前可用的全部事件"""
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+
+        changes = []
+        offset = 0
+        while offset + self.EVENT_HEADER.size <= len(data):
+            _, mask, _, length = self.EVENT_HEADER.unpack_from(data, offset)
+            offset += self.EVENT_HEADER.size
+            name = os.fsdecode(data[offset:offset + length].rstrip(b'\0'))
+            offset += length
+
+            if mask & self.IN_Q_OVERFLOW:
+                changes.append((CHANGE_SNAPSHOT, snapshot_directory(self.directory)))
+                continue
+            if mask & self.IN_ISDIR or not is_image_file(name):
+                continue
+            path = os.path.normpath(os.path.join(self.directory, name))
+            if mask & (self.IN_MOVED_FROM | self.IN_DELETE):
+                changes.append((CHANGE_REMOVED, path))
+            elif mask & self.IN_MOVED_TO:
+                changes.append((CHANGE_ADDED, path))
+            else:
+                changes.append((CHANGE_MODIFIED, path))
+        return changes
+
+
+class PollingWatcher(DirectoryWatcher):
+    """
+    轮询目录监视器 - 每次只读取目录本身的修改时间
+    目录变化时（或每隔较长的间隔，用于发现原地修改的文件）才重新列出目录，
+    快照交给主线程与目录索引中已有的文件信息比较，监视器自身不保存文件列表
+    """
+
+    def __init__(self, directory, callback, interval=0.5, rescan_interval=300):
+        """
+        Args:
+            interval: 轮询间隔（秒）
+            rescan_interval: 目录未变化时重新列出目录的间隔（秒），0表示只在目录变化时列出
+        """
+        super().__init__(directory, callback)
+        self.interval = interval
+        self.rescan_interval = rescan_interval
+
+    def _run(self):
+        try:
+            last_mtime = os.stat(self.directory).st_mtime_ns
+        except OSError:
+            return
+
+        last_scan = time.monotonic()
+        while not self._stop.wait(self.interval):
+            try:
+                mtime = os.stat(self.directory).st_mtime_ns
+                due = self.rescan_interval > 0 and time.monotonic() - last_scan >= self.rescan_interval
+                if mtime == last_mtime and not due:
+                    continue
+                # 文件可能仍在写入，稍等后再列出
+                time.sleep(self.settle_delay)
+                last_mtime = mtime
+                last_scan = time.monotonic()
+                snapshot = snapshot_directory(self.directory)
+            except OSError:
+                continue
+            if not self._stop.is_set():
+                self.callback([(CHANGE_SNAPSHOT, snapshot)])
+
+
+def create_watcher(directory, callback, rescan_interval=300):
+    """创建目录监视器，Linux上优先使用inotify，不可用时使用轮询"""
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(directory, callback)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用，改用轮询监视目录: {e}")
+    return PollingWatcher(directory, callback, rescan_interval=rescan_interval)
+
+
+class DirectoryWatcherMixin:
+    """目录监视混合类 - 目录中的文件被外部添加、删除或修改时增量更新图片列表和缓存"""
+
+    def _init_directory_watcher(self):
+        """初始化目录监视状态"""
+        self.directory_watcher = None
+        self.watch_generation = 0
+
+    def watch_directory(self, directory):
+        """开始监视目录，替换之前的监视器"""
+        self.stop_watching_directory()
+        generation = self.watch_generation
+        try:
+            self.directory_watcher = create_watcher(
+                directory, lambda changes: self.root.after(0, self._apply_directory_changes, generation, changes),
+                self.config_manager.get_watch_rescan_interval())
+            self.directory_watcher.start()
+        except OSError as e:
+            self.directory_watcher = None
+            print(f"无法监视目录 {directory}: {e}")
+
+    def stop_watching_directory(self):
+        """停止当前的目录监视"""
+        self.watch_generation += 1
+        if self.directory_watcher is not None:
+            self.directory_watcher.stop()
+            self.directory_watcher = None
+
+    def _apply_directory_changes(self, generation, changes):
+        """在主线程中将文件变化应用到目录索引，当前序号保持指向同一张图片"""
+        if generation != self.watch_generation or self.directory_index is None:
+            return
+
+        index = self.directory_index
+        current_path = self.image_paths[self.current_index] if self.image_paths else None
+        if changes and changes[0][0] == CHANGE_SNAPSHOT:
+            changes = self._diff_snapshot(index, changes[0][1])
+
+        added = []
+        changed = set()
+        for kind, path in changes:
+            stat = None
+            if kind != CHANGE_REMOVED:
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    pass
+
+            if not index.complete:
+                if stat is None:
+                    self.scan_removed.add(path)
+                else:
+                    self.scan_removed.discard(path)
+            if stat is None:
+                if path in index:
+                    index.remove(path)
+                    changed.add(path)
+                self.image_cache.remove(path)
+                self.encoded_cache.remove(path)
+            elif path not in index:
+                added.append((path, stat))
+            elif index.stats.get(path) != compact_stat(stat):
+                index.update_stat(path, stat)
+                # 只作废内容已变化的缓存项
+                self.image_cache.validate(path)
+                self.encoded_cache.remove(path)
+                changed.add(path)
+        index.add(added)
+
+        if not (added or changed):
+            return
+        print(f"目录已更新：新增 {len(added)} 张，删除或修改 {len(changed)} 张")
+        if index.complete:
+            # 扫描未完成时保留扫描开始前的目录修改时间，由扫描结束时保存索引
+            try:
+                index.dir_mtime_ns = os.stat(index.directory).st_mtime_ns
+            except OSError:
+                pass
+            self.schedule_listing_save()
+
+        if not self.image_paths:
+            self.canvas.delete("all")
+            self.root.title("图片查看器 - 无图片")
+            return
+        if current_path is None:
+            self.current_index = 0
+            self.enable_navigation()
+            self.show_current_image()
+            return
+
+        self.follow_current_path(current_path)
+        if current_path in changed:
+            # 当前图片被删除或内容已变化
+            self.show_current_image()
+        self.start_metadata_probe()
+
+    @staticmethod
+    def _diff_snapshot(index, snapshot):
+        """将目录快照与索引比较得到变化列表，快照只包含目录本身，子目录中的图片不受影响"""
+        changes = [(CHANGE_REMOVED, path) for path in index.stats.keys() - snapshot.keys()
+                   if os.sep not in index.relative_path(path)]
+        for path, stat in snapshot.items():
+            if index.stats.get(path) != stat:
+                changes.append((CHANGE_MODIFIED if path in index else CHANGE_ADDED, path))
+        return changes
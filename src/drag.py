@@ -7,6 +7,7 @@ Drag and Drop Functionality Module
 
 import os
 from tkinter import messagebox
+from .directory_index import walk_images
 
 
 class DragMixin:
@@ -97,7 +98,7 @@ class DragMixin:
         if len(image_files) == 1:
             image_path = image_files[0]
             directory = os.path.dirname(image_path)
-            self._load_images_from_directory(directory)
+            self._load_images_from_directory(directory, image_path)
             self._display_selected_image(image_path)
             print(f"已加载单个图片：{os.path.basename(image_path)}")
         else:
@@ -107,7 +108,7 @@ class DragMixin:
                 return
 
             directory = directories.pop()
-            self._load_images_from_directory(directory)
+            self._load_images_from_directory(directory, image_files[0])
             self._display_selected_image(image_files[0])
             print(f"已加载多个图片（{len(image_files)}），跳转到：{os.path.basename(image_files[0])}")
 
@@ -118,17 +119,15 @@ class DragMixin:
             messagebox.showerror("错误", "所选目录不包含支持的图片文件。")
             return
 
-        self.current_index = 0
-        self.show_current_image()
+        self.jump_to_index(0)
         self.is_playing = True
         self.start_playback()
         print(f"已加载目录：{directory}，从第一张图片开始播放")
 
-    def _load_images_from_directory(self, directory):
-        """从目录加载图片"""
+    def _load_images_from_directory(self, directory, target=None):
+        """从目录加载图片，目标图片无需等待目录扫描完成"""
         if directory != self.last_directory or not self.image_paths:
-            self.last_directory = directory
-            self.load_directory_images(directory)
+            self.load_directory_images(directory, target)
 
     def _display_selected_image(self, image_path):
         """显示选择的图片"""
@@ -136,15 +135,13 @@ class DragMixin:
             return
 
         try:
-            self.current_index = self.image_paths.index(image_path)
+            index = self.directory_index.position(os.path.normpath(image_path))
         except ValueError:
-            self.current_index = 0
-        self.show_current_image()
+            index = 0
+        self.jump_to_index(index)
 
     def _directory_contains_images(self, directory, supported_extensions):
-        """检查目录是否包含图片文件"""
-        for root, _, files in os.walk(directory):
-            for file in files:
-                if os.path.splitext(file)[1].lower() in supported_extensions:
-                    return True
+        """检查目录（含子目录）是否包含图片文件，找到第一张即停止遍历"""
+        for _ in walk_images(directory, recursive=True):
+            return True
         return False
\ No newline at end of file
@@ -0,0 +1,186 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片文件字节缓存模块
+Encoded Image Bytes Cache Module
+"""
+
+import io
+import os
+import threading
+from collections import OrderedDict
+
+
+class EncodedCache:
+    """二级缓存 - 在内存中保存图片文件的原始字节，解码缓存未命中时无需再次读盘"""
+
+    def __init__(self, limit=0):
+        """
+        初始化文件字节缓存
+
+        Args:
+            limit: 缓存大小上限（字节）
+        """
+        self.lock = threading.Lock()
+        self.limit = limit
+        self.current_size = 0
+
+        # 路径 -> (文件大小, 修改时间, 文件字节)，顺序即LRU顺序
+        self._entries = OrderedDict()
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+
+    def __contains__(self, path):
+        with self.lock:
+            return path in self._entries
+
+    def set_limit(self, limit):
+        """设置缓存大小上限，缩小时淘汰最久未使用的文件"""
+        with self.lock:
+            self.limit = limit
+            self._trim_locked()
+
+    def get(self, path):
+        """
+        获取文件字节，文件已被修改时视为未命中
+
+        Returns:
+            bytes: 文件内容，未命中时返回None
+        """
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.remove(path)
+            return None
+
+        with self.lock:
+            item = self._entries.get(path)
+            if item is not None and item[:2] == (stat.st_size, stat.st_mtime_ns):
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return item[2]
+            if item is not None:
+                del self._entries[path]
+                self.current_size -= len(item[2])
+            self.misses += 1
+            return None
+
+    def read(self, path):
+        """
+        读取文件字节，优先使用缓存，未命中时整体读入并放入缓存
+        超过单个文件上限、读入后也不会缓存的文件不读取
+
+        Returns:
+            bytes: 文件内容，文件过大时返回None
+        """
+        data = self.get(path)
+        if data is not None:
+            return data
+        if not self.accepts(os.path.getsize(path)):
+            return None
+        return self.load(path)
+
+    def accepts(self, size):
+        """指定大小的文件能否放入缓存（不超过上限的一半）"""
+        return size <= self.limit * 0.5
+
+    def load(self, path):
+        """从磁盘整体读入文件字节并放入缓存"""
+        with open(path, 'rb') as f:
+            stat = os.fstat(f.fileno())
+            data = f.read()
+        self.put(path, data, stat.st_size, stat.st_mtime_ns)
+        return data
+
+    def put(self, path, data, file_size, mtime_ns):
+        """放入文件字节，超过上限一半的文件不缓存"""
+        with self.lock:
+            if not self.accepts(len(data)):
+                return False
+            old = self._entries.pop(path, None)
+            if old is not None:
+                self.current_size -= len(old[2])
+            self._entries[path] = (file_size, mtime_ns, data)
+            self.current_size += len(data)
+            self._trim_locked()
+            return True
+
+    def remove(self, path):
+        """移除指定路径的缓存"""
+        with self.lock:
+            item = self._entries.pop(path, None)
+            if item is None:
+                return False
+            self.current_size -= len(item[2])
+            return True
+
+    def rename(self, old_path, new_path):
+        """重命名缓存项"""
+        with self.lock:
+            item = self._entries.pop(old_path, None)
+            if item is None:
+                return False
+            self._entries[new_path] = item
+            return True
+
+    def clear(self):
+        """清空所有缓存"""
+        with self.lock:
+            self._entries.clear()
+            self.current_size = 0
+
+    def stats(self):
+        """获取缓存统计：文件数、大小、上限、命中和未命中次数"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'count': len(self._entries),
+                'size': self.current_size,
+                'limit': self.limit,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0
+            }
+
+    def _trim_locked(self):
+        """在持有锁的情况下淘汰最久未使用的文件，直到不超过上限"""
+        while self.current_size > self.limit and self._entries:
+            _, item = self._entries.popitem(last=False)
+            self.current_size -= len(item[2])
+
+
+class EncodedCacheMixin:
+    """文件字节缓存混合类"""
+
+    def _init_encoded_cache(self):
+        """初始化文件字节缓存，上限随内存预算按比例分配"""
+        # 内存预算中分给文件字节缓存的比例，其余用于解码后的图片
+        self.encoded_cache_share = 0.2
+        self.encoded_cache = EncodedCache()
+
+    def set_memory_budget(self, budget):
+        """按比例将内存预算分配给解码图片缓存和文件字节缓存"""
+        encoded_limit = int(budget * self.encoded_cache_share)
+        self.encoded_cache.set_limit(encoded_limit)
+        self.image_cache.set_limit(budget - encoded_limit)
+
+    def get_memory_budget(self):
+        """当前两级缓存的总上限"""
+        return self.image_cache.limit + self.encoded_cache.limit
+
+    def open_image_source(self, path):
+        """
+        获取用于解码的图片数据源，文件字节从二级缓存读取
+        不会放入缓存的大文件直接按路径解码，不额外占用一份文件大小的内存
+
+        Returns:
+            BytesIO 或 str: 文件内容或图片路径
+        """
+        data = self.encoded_cache.read(path)
+        return io.BytesIO(data) if data is not None else path
+
+    def get_encoded_cache_stats(self):
+        """获取文件字节缓存统计信息"""
+        return self.encoded_cache.stats()
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+相邻目录导航功能模块
+Sibling Folder Navigation Functionality Module
+"""
+
+import os
+import threading
+from .directory_index import DirectoryIndex, ORDER_NAME, natural_sort_key, walk_images
+
+
+def find_sibling_directory(directory, direction, recursive=False):
+    """
+    查找同级目录中下一个或上一个包含图片的目录
+
+    Args:
+        directory: 当前目录
+        direction: "next" 或 "prev"
+        recursive: 是否把子目录中的图片也算作目录中的图片
+
+    Returns:
+        str: 相邻目录路径，没有时返回None
+    """
+    directory = os.path.normpath(directory)
+    parent = os.path.dirname(directory)
+    if parent == directory:
+        return None
+    try:
+        with os.scandir(parent) as scanner:
+            siblings = [entry.path for entry in scanner if entry.is_dir(follow_symlinks=False)]
+    except OSError:
+        return None
+
+    siblings.sort(key=lambda path: natural_sort_key(os.path.basename(path)))
+    siblings = [os.path.normpath(path) for path in siblings]
+    try:
+        position = siblings.index(directory)
+    except ValueError:
+        return None
+    candidates = siblings[position + 1:] if direction == "next" else reversed(siblings[:position])
+    for candidate in candidates:
+        for _ in walk_images(candidate, recursive):
+            return candidate
+    return None
+
+
+def find_boundary_image(directory, direction, order=ORDER_NAME, recursive=False):
+    """
+    获取目录按当前排序方式的第一张（向后）或最后一张（向前）图片
+
+    Returns:
+        tuple: (图片路径, 为查找建立的完整目录索引或None)，没有图片时图片路径为None
+    """
+    walker = walk_images(directory, recursive)
+    if direction == "next" and recursive and order == ORDER_NAME:
+        # 深度优先遍历本身就是自然顺序，第一张图片无需遍历整个目录树
+        for path, _ in walker:
+            return path, None
+        return None, None
+
+    index = DirectoryIndex(directory, order, recursive)
+    try:
+        # 与载入目录时相同，在遍历之前记录目录修改时间
+        index.dir_mtime_ns = os.stat(directory).st_mtime_ns
+    except OSError:
+        return None, None
+    index.add(list(walker))
+    index.complete = True
+    if not index.paths:
+        return None, None
+    return (index.paths[0] if direction == "next" else index.paths[-1]), index
+
+
+class FolderNavigationMixin:
+    """相邻目录导航混合类 - 切换到上一个或下一个同级目录，并在接近目录边界时提前预热相邻目录的边界图片"""
+
+    def _init_folder_navigation(self):
+        """初始化相邻目录导航状态"""
+        # (当前目录, 方向) -> (相邻目录, 边界图片, 相邻目录的索引或None)，没有相邻目录时为None
+        self.sibling_folders = {}
+        # 距离目录首尾多少张图片时开始预热相邻目录
+        self.folder_boundary_margin = 5
+
+    def navigate_folder(self, direction):
+        """
+        切换到下一个目录的第一张图片，或上一个目录的最后一张图片
+
+        Args:
+            direction: "next" 或 "prev"
+        """
+        if not self.last_directory:
+            return
+        # 取出预热时的结果，其中的索引交给新目录使用后不再共享
+        sibling = self.sibling_folders.pop((self.last_directory, direction), None)
+        if sibling is None:
+            sibling = self._find_sibling_folder(self.last_directory, direction)
+        if sibling is None:
+            print("已经是最后一个目录" if direction == "next" else "已经是第一个目录")
+            return
+
+        directory, path, index = sibling
+        self.load_directory_images(directory, path, index)
+        self.prefetch_planner.record_navigation(self.current_index)
+        self.zoom_factor = 1.0
+        self.show_current_image()
+        print(f"已切换到目录：{directory}")
+
+    def _find_sibling_folder(self, directory, direction):
+        """查找相邻目录及其边界图片，同时返回查找时建立的索引"""
+        sibling = find_sibling_directory(directory, direction, self.recursive_browsing)
+        if sibling is None:
+            return None
+        path, index = find_boundary_image(sibling, direction, self.sort_order, self.recursive_browsing)
+        return (sibling, path, index) if path else None
+
+    def folder_boundary_paths(self):
+        """
+        当前图片接近目录首尾时返回相邻目录的边界图片，用于预加载
+        相邻目录尚未查找时在后台查找，找到后重新安排预加载
+
+        Returns:
+            list: 需要预加载的相邻目录边界图片路径
+        """
+        index = self.directory_index
+        if index is None or not index.complete or not self.image_paths:
+            return []
+
+        directory = self.last_directory
+        near = []
+        if len(self.image_paths) - 1 - self.current_index < self.folder_boundary_margin:
+            near.append("next")
+        if self.current_index < self.folder_boundary_margin:
+            near.append("prev")
+
+        paths = []
+        for direction in near:
+            key = (directory, direction)
+            if key not in self.sibling_folders:
+                # 只保留当前目录的查找结果
+                for stale in [k for k in self.sibling_folders if k[0] != directory]:
+                    del self.sibling_folders[stale]
+                self.sibling_folders[key] = None
+                threading.Thread(target=self._warm_sibling_folder, args=(key,), daemon=True).start()
+            elif self.sibling_folders[key] is not None:
+                paths.append(self.sibling_folders[key][1])
+        return paths
+
+    def _warm_sibling_folder(self, key):
+        """后台查找相邻目录，完成后回到主线程安排预加载"""
+        try:
+            sibling = self._find_sibling_folder(*key)
+        except Exception as e:
+            print(f"查找相邻目录失败: {e}")
+            return
+        if sibling is not None:
+            self.root.after(0, self._store_sibling_folder, key, sibling)
+
+    def _store_sibling_folder(self, key, sibling):
+        """记录相邻目录并把其边界图片加入预加载"""
+        if key[0] != self.last_directory or key not in self.sibling_folders:
+            return
+        self.sibling_folders[key] = sibling
+        if self.image_paths:
+            self.schedule_prefetch(self.plan_prefetch())
@@ -0,0 +1,690 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片缓存模块
+Image Cache Module
+"""
+
+import os
+import math
+import time
+import threading
+from collections import OrderedDict, namedtuple
+from PIL import Image
+
+# 每张图片的固定开销：Python对象、Pillow图像结构和内存块头
+IMAGE_OVERHEAD = 1024
+
+# 缓存中按原始模式保存的图像模式，其余模式解码后转换为RGB或RGBA
+NATIVE_MODES = ('1', 'L', 'LA', 'P', 'RGB', 'RGBA')
+
+
+def pixel_size(mode):
+    """Pillow内部存储每个像素占用的字节数（多通道模式按4字节对齐存储）"""
+    if mode in ('1', 'L', 'P'):
+        return 1
+    if mode.startswith('I;16') or mode in ('BGR;15', 'BGR;16'):
+        return 2
+    if mode == 'BGR;24':
+        return 3
+    return 4
+
+
+def storage_mode(img):
+    """图片在缓存中保存的模式：紧凑模式保持不变，其余转换为RGB或RGBA"""
+    if img.mode in NATIVE_MODES:
+        return img.mode
+    return 'RGBA' if img.mode in ('PA', 'La', 'RGBa') else 'RGB'
+
+
+def resample_mode(img):
+    """
+    高质量缩放所需的模式：二值图和调色板图只支持最近邻，需要先展开；
+    16位灰度等 reduce 不支持的模式先转换为缓存保存的模式
+    """
+    if img.mode == '1':
+        return 'L'
+    if img.mode == 'P':
+        return 'RGBA' if 'transparency' in img.info else 'RGB'
+    if img.mode.startswith(('I;16', 'BGR;')):
+        return storage_mode(img)
+    return img.mode
+
+
+# 仿射变换 (a, b, c, d, e, f)：原图坐标 (u, v) -> 显示坐标 (a*u + b*v + c, d*u + e*v + f)
+IDENTITY_TRANSFORM = (1.0, 0.0, 0.0, 0.0, 1.0, 0.0)
+
+
+def compose_transform(first, second):
+    """先应用 first 再应用 second 的仿射变换"""
+    a1, b1, c1, d1, e1, f1 = first
+    a2, b2, c2, d2, e2, f2 = second
+    return (a2 * a1 + b2 * d1, a2 * b1 + b2 * e1, a2 * c1 + b2 * f1 + c2,
+            d2 * a1 + e2 * d1, d2 * b1 + e2 * e1, d2 * c1 + e2 * f1 + f2)
+
+
+def invert_transform(transform):
+    """仿射变换的逆变换，即 Image.transform 需要的输出坐标 -> 输入坐标"""
+    a, b, c, d, e, f = transform
+    det = a * e - b * d
+    ia, ib, id_, ie = e / det, -b / det, -d / det, a / det
+    return ia, ib, -(ia * c + ib * f), id_, ie, -(id_ * c + ie * f)
+
+
+def rotation_transform(size, angle):
+    """
+    与 Image.rotate(angle, expand=True) 一致的旋转变换
+
+    Args:
+        size: 旋转前的尺寸 (宽, 高)
+        angle: 逆时针旋转角度
+
+    Returns:
+        tuple: (旋转前坐标 -> 旋转后坐标的变换, 旋转后的尺寸)
+    """
+    width, height = size
+    radians = -math.radians(angle)
+    cos, sin = round(math.cos(radians), 15), round(math.sin(radians), 15)
+    # Image.rotate 使用的输出坐标 -> 输入坐标矩阵
+    matrix = [cos, sin, 0.0, -sin, cos, 0.0]
+    cx, cy = width / 2, height / 2
+    matrix[2] = cos * -cx + sin * -cy + cx
+    matrix[5] = -sin * -cx + cos * -cy + cy
+    corners = [(matrix[0] * x + matrix[1] * y + matrix[2], matrix[3] * x + matrix[4] * y + matrix[5])
+               for x, y in ((0, 0), (width, 0), (width, height), (0, height))]
+    new_width = math.ceil(max(x for x, _ in corners)) - math.floor(min(x for x, _ in corners))
+    new_height = math.ceil(max(y for _, y in corners)) - math.floor(min(y for _, y in corners))
+    dx, dy = -(new_width - width) / 2.0, -(new_height - height) / 2.0
+    matrix[2], matrix[5] = (matrix[0] * dx + matrix[1] * dy + matrix[2],
+                            matrix[3] * dx + matrix[4] * dy + matrix[5])
+    return invert_transform(matrix), (new_width, new_height)
+
+
+def apply_transform(img, transform, size):
+    """
+    将原方向的图片按变换生成显示方向的图片
+
+    Args:
+        img: 原方向的图片
+        transform: 原图坐标 -> 显示坐标的变换，坐标单位与 img 一致
+        size: 输出尺寸
+    """
+    if transform == IDENTITY_TRANSFORM and size == img.size:
+        return img
+    return img.transform(size, Image.Transform.AFFINE, invert_transform(transform), Image.Resampling.BICUBIC)
+
+
+def file_stamp(path):
+    """文件的 (大小, 修改时间) 标记，用于判断缓存是否仍然有效，文件不存在时返回None"""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+# 文件头信息：尺寸、模式、附加信息、帧数和格式
+ImageProbe = namedtuple('ImageProbe', ('size', 'mode', 'info', 'frames', 'format'))
+
+
+def probe_image(source):
+    """只读取文件头获取图片信息，不解码像素"""
+    with Image.open(source) as img:
+        return ImageProbe(img.size, img.mode, dict(img.info), getattr(img, 'n_frames', 1), img.format)
+
+
+def release_source(img):
+    """
+    像素加载完成后断开图片与数据源的引用
+    TIFF等多帧格式加载后仍保留文件对象，缓存的图片会因此一直持有整份文件字节或文件句柄
+    """
+    for attr in ('fp', '_fp'):
+        source = getattr(img, attr, None)
+        if source is None:
+            continue
+        if getattr(img, '_exclusive_fp', False) and hasattr(source, 'close'):
+            source.close()
+        setattr(img, attr, None)
+
+
+class CacheEntry:
+    """缓存项 - 保存解码后的图片、原始尺寸、多分辨率金字塔和超大图片的瓦片存储"""
+
+    __slots__ = ('image', 'size', 'full_size', 'transform', 'levels', 'tiles', 'cost', 'frequency', 'priority',
+                 'stamp')
+
+    def __init__(self, image, size, full_size=None, tiles=None, cost=0.0, stamp=None, transform=IDENTITY_TRANSFORM):
+        self.image = image
+        self.size = size  # 包含金字塔各层的总大小
+        # 原图按当前方向的尺寸，缓存的是缩小后的代理图时大于 image.size
+        self.full_size = full_size or image.size
+        # 旋转、翻转后原图坐标 -> 当前方向原图尺寸坐标的变换，升级为原图时按此重新变换
+        self.transform = transform
+        # 金字塔：levels[i] 为 image 缩小 2^(i+1) 倍的图片，按需构建
+        self.levels = []
+        # 超大图片的瓦片存储，此时 image 为概览图
+        self.tiles = tiles
+        # 淘汰策略参数：解码耗时（秒）、访问次数和GDSF优先级
+        self.cost = cost
+        self.frequency = 1
+        self.priority = 0.0
+        # 解码时文件的 (大小, 修改时间)，与路径一起确定缓存内容
+        self.stamp = stamp
+
+    @property
+    def scale(self):
+        """原图相对缓存图片的缩放倍数"""
+        return self.full_size[0] / max(1, self.image.width)
+
+    @property
+    def is_proxy(self):
+        """是否为按显示分辨率解码的代理图"""
+        return self.full_size != self.image.size
+
+    def close(self):
+        """释放图片、金字塔各层和瓦片存储"""
+        self.image.close()
+        for level in self.levels:
+            level.close()
+        self.levels = []
+        if self.tiles is not None:
+            self.tiles.close()
+            self.tiles = None
+
+
+class ImageCache:
+    """
+    线程安全的图片缓存 - 负责单飞加载、内存计数和淘汰
+    缓存项与当前目录无关，按路径和文件标记校验，切换目录后仍可复用
+    """
+
+    # 淘汰策略：GDSF综合解码耗时、大小和访问次数，LRU只按最近使用时间
+    POLICY_GDSF = 'gdsf'
+    POLICY_LRU = 'lru'
+
+    def __init__(self, limit=0, policy=POLICY_GDSF):
+        """
+        初始化图片缓存
+
+        Args:
+            limit: 缓存大小上限（字节）
+            policy: 淘汰策略，POLICY_GDSF 或 POLICY_LRU
+        """
+        self.lock = threading.RLock()
+        self.limit = limit
+        self.policy = policy
+        # 缓存项与登记的额外占用之和
+        self.current_size = 0
+
+        # 缓存项之外的内存占用（画布PhotoImage、动画帧、未统计部分）：名称 -> 字节数
+        self.reserved = {}
+        self.reserved_size = 0
+
+        # 路径 -> 缓存项，顺序即LRU顺序（最旧的在最前）
+        self._entries = OrderedDict()
+
+        # 正在解码的路径 -> 完成事件
+        self._inflight = {}
+
+        # 固定的路径（当前图片和预加载窗口），不会被淘汰
+        self._pinned = frozenset()
+        # GDSF老化基准：最近一次被淘汰项的优先级
+        self._clock = 0.0
+
+        # 统计信息
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __contains__(self, path):
+        with self.lock:
+            return path in self._entries
+
+    def __len__(self):
+        with self.lock:
+            return len(self._entries)
+
+    def get(self, path, default=None):
+        """获取缓存的 (图片, 大小)，不改变LRU顺序"""
+        with self.lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return default
+            return entry.image, entry.size
+
+    def get_entry(self, path):
+        """获取完整的缓存项，不存在时返回None"""
+        with self.lock:
+            return self._entries.get(path)
+
+    def touch(self, path):
+        """将缓存项标记为最近使用，并增加访问次数"""
+        with self.lock:
+            entry = self._entries.get(path)
+            if entry is not None:
+                self._entries.move_to_end(path)
+                entry.frequency += 1
+                self._update_priority_locked(entry)
+
+    def lookup(self, path):
+        """
+        查询图片是否已缓存并计入命中率统计，文件已被修改时视为未命中
+        访问次数由 touch 记录
+
+        Returns:
+            bool: 是否命中
+        """
+        if self.validate(path):
+            with self.lock:
+                self.hits += 1
+            return True
+        with self.lock:
+            self.misses += 1
+        return False
+
+    def validate(self, path):
+        """
+        校验缓存项对应的文件是否未被修改，已修改或删除时移除缓存项
+
+        Returns:
+            bool: 缓存项是否存在且有效
+        """
+        with self.lock:
+            entry = self._entries.get(path)
+            if entry is None:
+                return False
+            stamp = entry.stamp
+        if stamp is None or file_stamp(path) == stamp:
+            return True
+        self._remove_if(path, entry)
+        return False
+
+    def revalidate(self):
+        """
+        校验所有缓存项，移除文件已修改或删除的部分
+
+        Returns:
+            int: 移除的缓存项数量
+        """
+        with self.lock:
+            items = [(path, entry, entry.stamp) for path, entry in self._entries.items()]
+
+        removed = 0
+        for path, entry, stamp in items:
+            if stamp is not None and file_stamp(path) != stamp:
+                removed += self._remove_if(path, entry)
+        return removed
+
+    def _remove_if(self, path, entry):
+        """仅当路径仍对应该缓存项时移除"""
+        with self.lock:
+            if self._entries.get(path) is not entry:
+                return False
+            del self._entries[path]
+            self.current_size -= entry.size
+        entry.close()
+        return True
+
+    def set_pinned(self, paths):
+        """设置固定的路径集合，替换之前的设置，固定的图片不会被淘汰"""
+        with self.lock:
+            self._pinned = frozenset(paths)
+
+    def is_pinned(self, path):
+        """路径是否被固定"""
+        with self.lock:
+            return path in self._pinned
+
+    def stats(self):
+        """获取缓存统计：策略、图片数、大小、命中、未命中和淘汰次数"""
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'policy': self.policy,
+                'count': len(self._entries),
+                'size': self.current_size,
+                'limit': self.limit,
+                'pinned': len(self._pinned),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_ratio': self.hits / lookups if lookups else 0.0,
+                'evictions': self.evictions
+            }
+
+    def set_policy(self, policy):
+        """
+        切换淘汰策略，已缓存的图片保留，统计信息重新开始计数以便比较
+
+        Returns:
+            bool: 策略是否有效
+        """
+        if policy not in (self.POLICY_GDSF, self.POLICY_LRU):
+            return False
+        with self.lock:
+            if policy != self.policy:
+                self.policy = policy
+                self.hits = self.misses = self.evictions = 0
+        return True
+
+    def set_limit(self, limit):
+        """设置缓存大小上限，缩小时按LRU顺序淘汰超出部分"""
+        with self.lock:
+            self.limit = limit
+            self._trim_locked()
+
+    def average_entry_size(self):
+        """缓存中每张图片的平均大小，缓存为空时返回0"""
+        with self.lock:
+            if not self._entries:
+                return 0
+            return (self.current_size - self.reserved_size) / len(self._entries)
+
+    @staticmethod
+    def predict_size(mode, size):
+        """
+        预测指定模式和尺寸的图片解码后占用的内存
+
+        Args:
+            mode: Pillow图像模式
+            size: 图片尺寸 (宽, 高)
+
+        Returns:
+            int: 像素存储、行指针、调色板和对象开销之和（字节）
+        """
+        width, height = size
+        total = width * height * pixel_size(mode) + height * 8 + IMAGE_OVERHEAD
+        if mode in ('P', 'PA'):
+            total += 1024
+        return total
+
+    @classmethod
+    def measure_size(cls, img):
+        """测量已解码图片实际占用的内存"""
+        return cls.predict_size(img.mode, img.size)
+
+    def reserve(self, name, size):
+        """
+        登记缓存项之外的内存占用，计入缓存大小，超出上限时淘汰旧图片
+
+        Args:
+            name: 占用名称
+            size: 占用字节数，为0时取消登记
+        """
+        with self.lock:
+            old = self.reserved.pop(name, 0)
+            if size > 0:
+                self.reserved[name] = size
+            else:
+                size = 0
+            self.reserved_size += size - old
+            self.current_size += size - old
+            self._trim_locked()
+
+    def get_reserved(self, name):
+        """获取登记的额外占用"""
+        with self.lock:
+            return self.reserved.get(name, 0)
+
+    def make_room(self, size, protect=()):
+        """
+        解码前按预测大小淘汰旧图片，避免解码完成后才发现放不下
+
+        Args:
+            size: 即将放入的图片大小
+            protect: 不允许淘汰的路径集合
+
+        Returns:
+            bool: 是否已有足够空间
+        """
+        with self.lock:
+            while self.current_size + size > self.limit:
+                if not self._evict_one_locked(protect=protect):
+                    break
+            return self.current_size + size <= self.limit
+
+    def _trim_locked(self, exclude=None):
+        """在持有锁的情况下淘汰图片，直到不超过上限（至少保留一张）"""
+        while self.current_size > self.limit and len(self._entries) > 1:
+            if not self._evict_one_locked(exclude=exclude):
+                break
+
+    def load(self, path, loader, protect=()):
+        """
+        单飞加载：同一路径的并发请求只会触发一次解码，其余请求等待结果
+
+        Args:
+            path: 图片路径
+            loader: 解码函数，接收路径并返回 (PIL图片, 原图尺寸, 瓦片存储或None)
+            protect: 放入缓存时不允许淘汰的路径集合
+
+        Returns:
+            bool: 图片是否已在缓存中
+        """
+        with self.lock:
+            if path in self._entries:
+                return True
+            event = self._inflight.get(path)
+            leader = event is None
+            if leader:
+                event = threading.Event()
+                self._inflight[path] = event
+
+        if not leader:
+            event.wait()
+            with self.lock:
+                return path in self._entries
+
+        try:
+            # 先记录文件标记，解码期间文件被修改时下次校验会失效
+            stamp = file_stamp(path)
+            start = time.monotonic()
+            img, full_size, tiles = loader(path)
+            entry = CacheEntry(img, 0, full_size, tiles, time.monotonic() - start, stamp)
+            return self._admit(path, entry, event, protect)
+        finally:
+            with self.lock:
+                if self._inflight.get(path) is event:
+                    del self._inflight[path]
+            event.set()
+
+    def is_loading(self, path):
+        """该路径是否正在由其他线程解码"""
+        with self.lock:
+            return path in self._inflight
+
+    def _admit(self, path, entry, event, protect=()):
+        """将解码完成的缓存项放入缓存，必要时淘汰旧图片"""
+        img_size = self.measure_size(entry.image)
+        if entry.tiles is not None:
+            img_size += entry.tiles.memory_budget
+        entry.size = img_size
+
+        with self.lock:
+            # 解码期间缓存被清空或该路径已被移除，丢弃结果
+            if self._inflight.get(path) is not event:
+                entry.close()
+                return False
+
+            if img_size > self.limit * 0.5:
+                entry.close()
+                return False
+
+            while self.current_size + img_size > self.limit:
+                if not self._evict_one_locked(protect=protect):
+                    break
+
+            if self.current_size + img_size > self.limit:
+                entry.close()
+                return False
+
+            self._entries[path] = entry
+            self.current_size += img_size
+            self._update_priority_locked(entry)
+            return True
+
+    def pyramid_level(self, path, max_factor):
+        """
+        获取缩小倍数不超过 max_factor 的最小金字塔层级，缺失的层级按需构建
+
+        Args:
+            path: 图片路径
+            max_factor: 允许的最大缩小倍数
+
+        Returns:
+            tuple: (图片, 缩小倍数)，不在缓存中时返回 (None, 1)
+        """
+        while True:
+            with self.lock:
+                entry = self._entries.get(path)
+                if entry is None:
+                    return None, 1
+
+                level = 0
+                width, height = entry.image.size
+                while (2 << level) <= max_factor and min(width, height) >> (level + 1) > 0:
+                    level += 1
+
+                if len(entry.levels) >= level:
+                    img = entry.levels[level - 1] if level else entry.image
+                    return img, 1 << level
+
+                source = entry.levels[-1] if entry.levels else entry.image
+                built = len(entry.levels)
+
+            # 在锁外缩小，避免阻塞其他线程
+            mode = resample_mode(source)
+            if mode != source.mode:
+                source = source.convert(mode)
+            reduced = source.reduce(2)
+            reduced_size = self.measure_size(reduced)
+
+            with self.lock:
+                if self._entries.get(path) is not entry or len(entry.levels) != built:
+                    reduced.close()
+                    continue
+                entry.levels.append(reduced)
+                entry.size += reduced_size
+                self.current_size += reduced_size
+                self._update_priority_locked(entry)
+                self._trim_locked(exclude=path)
+
+    def attach_tiles(self, path, tiles):
+        """
+        为缓存中的代理图挂接瓦片存储，放大查看时只读取视口内的原图区域
+
+        Returns:
+            bool: 是否挂接成功，失败时关闭瓦片存储
+        """
+        with self.lock:
+            entry = self._entries.get(path)
+            if entry is None or not entry.is_proxy or entry.tiles is not None:
+                tiles.close()
+                return False
+            entry.tiles = tiles
+            entry.size += tiles.memory_budget
+            self.current_size += tiles.memory_budget
+            self._update_priority_locked(entry)
+            self._trim_locked(exclude=path)
+            return True
+
+    def replace(self, path, img, full_size=None, transform=None, cost=None):
+        """
+        替换缓存中的图片（旋转、翻转、升级为原图后写回），同步更新内存计数
+        超出上限时淘汰其他图片
+
+        Args:
+            path: 图片路径
+            img: 新图片
+            full_size: 原图按新图片方向的尺寸，默认视新图片为原图
+            transform: 原图坐标 -> 新图片方向原图尺寸坐标的变换，默认沿用原缓存项的变换
+            cost: 新图片的解码耗时（秒），默认沿用原缓存项的耗时
+        """
+        img_size = self.measure_size(img)
+        with self.lock:
+            entry = CacheEntry(img, img_size, full_size)
+            old = self._entries.get(path)
+            if cost is not None:
+                entry.cost = cost
+            if transform is not None:
+                entry.transform = transform
+            elif old is not None:
+                entry.transform = old.transform
+            if old is not None:
+                self.current_size -= old.size
+                if cost is None:
+                    entry.cost = old.cost
+                entry.frequency = old.frequency
+                entry.stamp = old.stamp
+                if old.tiles is not None:
+                    if entry.is_proxy:
+                        # 瓦片按原图方向保存，旋转、翻转后由变换换算，继续用于放大显示
+                        entry.tiles = old.tiles
+                        entry.size += old.tiles.memory_budget
+                    else:
+                        old.tiles.close()
+                    old.tiles = None
+            self._entries[path] = entry
+            self.current_size += entry.size
+            self._update_priority_locked(entry)
+
+            self._trim_locked(exclude=path)
+
+    def remove(self, path):
+        """移除指定路径的缓存"""
+        with self.lock:
+            self._inflight.pop(path, None)
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                return False
+            self.current_size -= entry.size
+        entry.close()
+        return True
+
+    def rename(self, old_path, new_path):
+        """重命名缓存项，保持其为最近使用"""
+        with self.lock:
+            entry = self._entries.pop(old_path, None)
+            if entry is None:
+                return False
+            self._entries[new_path] = entry
+            return True
+
+    def _update_priority_locked(self, entry):
+        """
+        在持有锁的情况下更新GDSF优先级：老化基准 + 访问次数 × 解码耗时 / 大小
+        解码慢、占用小、访问多的图片优先保留
+        """
+        entry.priority = self._clock + entry.frequency * entry.cost / max(1, entry.size)
+
+    def _evict_one_locked(self, exclude=None, protect=()):
+        """在持有锁的情况下按淘汰策略淘汰一张未固定的图片，优先级相同时淘汰最久未使用的"""
+        victim = None
+        for path, entry in self._entries.items():
+            if path == exclude or path in self._pinned or path in protect:
+                continue
+            if self.policy == self.POLICY_LRU:
+                victim = path
+                break
+            if victim is None or entry.priority < self._entries[victim].priority:
+                victim = path
+        if victim is None:
+            return False
+
+        entry = self._entries.pop(victim)
+        self.current_size -= entry.size
+        self.evictions += 1
+        if self.policy == self.POLICY_GDSF:
+            self._clock = max(self._clock, entry.priority)
+        entry.close()
+        return True
+
+    def clear(self):
+        """清空所有缓存"""
+        with self.lock:
+            entries = list(self._entries.values())
+            self._entries.clear()
+            self._inflight.clear()
+            self._clock = 0.0
+            self.current_size = self.reserved_size
+        for entry in entries:
+            entry.close()
@@ -9,6 +9,7 @@ import os
 import threading
 import concurrent.futures
 from PIL import Image
+from .image_cache import ImageCache, compose_transform, invert_transform
 
 
 class FlipMixin:
@@ -20,14 +21,15 @@ class FlipMixin:
             return
 
         current_path = self.image_paths[self.current_index]
-        img_data = self.image_cache.get(current_path)
-        if not img_data:
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None:
             return
 
-        img, size = img_data
+        img, size = entry.image, entry.size
+        base_transform, (full_width, full_height) = entry.transform, entry.full_size
 
-        if size > self.cache_size_limit * 0.5:
-            print(f"图片大小 {size} 超过缓存限制 {self.cache_size_limit * 0.5}，无法翻转")
+        if size > self.image_cache.limit * 0.5:
+            print(f"图片大小 {size} 超过缓存限制 {self.image_cache.limit * 0.5}，无法翻转")
             return
 
         steps = 10
@@ -36,11 +38,12 @@ class FlipMixin:
 
         self.root.title(f"正在水平翻转 - {os.path.basename(current_path)}")
 
-        def compute_frame(step):
+        def frame_scale(step):
             progress = self.ease_in_out(step, steps, easing_type="quartic")
-            scale_x = 1 - 2 * progress
-            if scale_x == 0:
-                scale_x = 0.01
+            return 1 - 2 * progress or 0.01
+
+        def compute_frame(step):
+            scale_x = frame_scale(step)
             frame = img.transform(
                 img.size,
                 Image.AFFINE,
@@ -49,6 +52,13 @@ class FlipMixin:
             )
             return frame
 
+        def write_frame(step, frame):
+            # 变换随代理图一起翻转，放大时按翻转后的方向加载原图
+            scale_x = frame_scale(step)
+            matrix = (scale_x, 0, full_width * (1 - scale_x) / 2, 0, 1, 0)
+            transform = compose_transform(base_transform, invert_transform(matrix))
+            self.image_cache.replace(current_path, frame, (full_width, full_height), transform)
+
         def precompute_frames(img, callback):
             frame_cache = [None] * (steps + 1)
             with concurrent.futures.ThreadPoolExecutor(max_workers=min(steps + 1, os.cpu_count() or 4)) as executor:
@@ -59,10 +69,16 @@ class FlipMixin:
             callback(frame_cache)
 
         def on_frames_ready(frame_cache):
+            # 动画帧在播放期间计入缓存占用
+            self.image_cache.reserve(
+                'animation_frames', sum(ImageCache.measure_size(frame) for frame in frame_cache)
+            )
+
             def update_frame(step=0):
                 if step > steps:
+                    self.image_cache.reserve('animation_frames', 0)
                     flipped_img = frame_cache[-1]
-                    self.image_cache[current_path] = (flipped_img, size)
+                    write_frame(steps, flipped_img)
                     self.viewport_x = 0
                     self.viewport_y = 0
                     self.viewport_width = flipped_img.width
@@ -72,7 +88,7 @@ class FlipMixin:
                     return
 
                 current_frame = frame_cache[step]
-                self.image_cache[current_path] = (current_frame, size)
+                write_frame(step, current_frame)
                 self.viewport_x = 0
                 self.viewport_y = 0
                 self.viewport_width = current_frame.width
@@ -90,14 +106,15 @@ class FlipMixin:
             return
 
         current_path = self.image_paths[self.current_index]
-        img_data = self.image_cache.get(current_path)
-        if not img_data:
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None:
             return
 
-        img, size = img_data
+        img, size = entry.image, entry.size
+        base_transform, (full_width, full_height) = entry.transform, entry.full_size
 
-        if size > self.cache_size_limit * 0.5:
-            print(f"图片大小 {size} 超过缓存限制 {self.cache_size_limit * 0.5}，无法翻转")
+        if size > self.image_cache.limit * 0.5:
+            print(f"图片大小 {size} 超过缓存限制 {self.image_cache.limit * 0.5}，无法翻转")
             return
 
         steps = 10
@@ -106,11 +123,12 @@ class FlipMixin:
 
         self.root.title(f"正在垂直翻转 - {os.path.basename(current_path)}")
 
-        def compute_frame(step):
+        def frame_scale(step):
             progress = self.ease_in_out(step, steps, easing_type="quartic")
-            scale_y = 1 - 2 * progress
-            if scale_y == 0:
-                scale_y = 0.01
+            return 1 - 2 * progress or 0.01
+
+        def compute_frame(step):
+            scale_y = frame_scale(step)
             frame = img.transform(
                 img.size,
                 Image.AFFINE,
@@ -119,6 +137,13 @@ class FlipMixin:
             )
             return frame
 
+        def write_frame(step, frame):
+            # 变换随代理图一起翻转，放大时按翻转后的方向加载原图
+            scale_y = frame_scale(step)
+            matrix = (1, 0, 0, 0, scale_y, full_height * (1 - scale_y) / 2)
+            transform = compose_transform(base_transform, invert_transform(matrix))
+            self.image_cache.replace(current_path, frame, (full_width, full_height), transform)
+
         def precompute_frames(img, callback):
             frame_cache = [None] * (steps + 1)
             with concurrent.futures.ThreadPoolExecutor(max_workers=min(steps + 1, os.cpu_count() or 4)) as executor:
@@ -129,10 +154,16 @@ class FlipMixin:
             callback(frame_cache)
 
         def on_frames_ready(frame_cache):
+            # 动画帧在播放期间计入缓存占用
+            self.image_cache.reserve(
+                'animation_frames', sum(ImageCache.measure_size(frame) for frame in frame_cache)
+            )
+
             def update_frame(step=0):
                 if step > steps:
+                    self.image_cache.reserve('animation_frames', 0)
                     flipped_img = frame_cache[-1]
-                    self.image_cache[current_path] = (flipped_img, size)
+                    write_frame(steps, flipped_img)
                     self.viewport_x = 0
                     self.viewport_y = 0
                     self.viewport_width = flipped_img.width
@@ -142,7 +173,7 @@ class FlipMixin:
                     return
 
                 current_frame = frame_cache[step]
-                self.image_cache[current_path] = (current_frame, size)
+                write_frame(step, current_frame)
                 self.viewport_x = 0
                 self.viewport_y = 0
                 self.viewport_width = current_frame.width
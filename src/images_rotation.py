@@ -10,6 +10,7 @@ import threading
 import concurrent.futures
 import tkinter as tk
 from PIL import Image
+from .image_cache import ImageCache, compose_transform, rotation_transform
 
 
 class RotationMixin:
@@ -71,21 +72,28 @@ class RotationMixin:
             return
 
         current_path = self.image_paths[self.current_index]
-        img_data = self.image_cache.get(current_path)
-        if not img_data:
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None:
             return
 
-        img, size = img_data
+        img = entry.image
+        base_transform, base_full_size = entry.transform, entry.full_size
         steps = 10
         duration = 500
         step_time = duration // steps
 
         self.root.title(f"正在处理[{target_angle}°]中")
 
+        def frame_angle(step):
+            return target_angle * self.ease_in_out(step, steps)
+
         def compute_frame(step):
-            progress = self.ease_in_out(step, steps)
-            current_angle = target_angle * progress
-            return img.rotate(current_angle, expand=True, resample=Image.BICUBIC)
+            return img.rotate(frame_angle(step), expand=True, resample=Image.BICUBIC)
+
+        def write_frame(step, frame):
+            # 原图尺寸和变换随代理图一起旋转，放大时按旋转后的方向加载原图
+            transform, full_size = rotation_transform(base_full_size, frame_angle(step))
+            self.image_cache.replace(current_path, frame, full_size, compose_transform(base_transform, transform))
 
         def precompute_frames(img, target_angle, steps, callback):
             frame_cache = [None] * (steps + 1)
@@ -97,9 +105,15 @@ class RotationMixin:
             callback(frame_cache)
 
         def on_frames_ready(frame_cache):
+            # 动画帧在播放期间计入缓存占用
+            self.image_cache.reserve(
+                'animation_frames', sum(ImageCache.measure_size(frame) for frame in frame_cache)
+            )
+
             def update_frame(step=0):
                 if step > steps:
-                    self.image_cache[current_path] = (frame_cache[-1], size)
+                    self.image_cache.reserve('animation_frames', 0)
+                    write_frame(steps, frame_cache[-1])
                     self.viewport_x = 0
                     self.viewport_y = 0
                     self.viewport_width = frame_cache[-1].width
@@ -109,7 +123,7 @@ class RotationMixin:
                     return
 
                 rotated_img = frame_cache[step]
-                self.image_cache[current_path] = (rotated_img, size)
+                write_frame(step, rotated_img)
                 self.viewport_x = 0
                 self.viewport_y = 0
                 self.viewport_width = rotated_img.width
@@ -125,13 +139,13 @@ class RotationMixin:
     def rotate_image(self, angle):
         """直接旋转图片（无动画）"""
         current_path = self.image_paths[self.current_index]
-        img_data = self.image_cache.get(current_path)
-        if not img_data:
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None:
             return
 
-        img, size = img_data
-        rotated_img = img.rotate(angle, expand=True, resample=Image.BICUBIC)
-        self.image_cache[current_path] = (rotated_img, size)
+        rotated_img = entry.image.rotate(angle, expand=True, resample=Image.BICUBIC)
+        transform, full_size = rotation_transform(entry.full_size, angle)
+        self.image_cache.replace(current_path, rotated_img, full_size, compose_transform(entry.transform, transform))
         self.viewport_x = 0
         self.viewport_y = 0
         self.viewport_width = rotated_img.width
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化目录索引模块
+Persistent Directory Listing Module
+"""
+
+import os
+import json
+import hashlib
+import threading
+
+
+class ListingStore:
+    """目录索引存储 - 按目录保存图片条目、文件信息和已读取的头部信息，以目录修改时间校验"""
+
+    VERSION = 1
+
+    def __init__(self, store_dir, max_bytes=64 * 1024 * 1024):
+        """
+        初始化目录索引存储
+
+        Args:
+            store_dir: 存储目录
+            max_bytes: 存储目录大小上限（字节），超出时删除最久未打开的目录索引
+        """
+        self.store_dir = store_dir
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+
+        # 存储目录当前大小，首次保存时统计
+        self.total_size = None
+
+    def _file_for(self, directory):
+        """目录对应的索引文件路径"""
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(directory)).encode('utf-8')).hexdigest()
+        return os.path.join(self.store_dir, f"{key}.json")
+
+    def load(self, directory):
+        """
+        读取目录索引
+
+        Returns:
+            tuple: (目录修改时间纳秒, 条目列表)，不存在或无法读取时返回None
+        """
+        path = self._file_for(directory)
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != self.VERSION or data.get('directory') != directory:
+                return None
+            # 更新修改时间作为LRU访问记录
+            os.utime(path)
+            return data['mtime_ns'], data['entries']
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def save(self, directory, mtime_ns, entries):
+        """写入目录索引，先写临时文件再替换，避免留下不完整的索引"""
+        path = self._file_for(directory)
+        data = {'version': self.VERSION, 'directory': directory, 'mtime_ns': mtime_ns, 'entries': entries}
+        with self.lock:
+            try:
+                os.makedirs(self.store_dir, exist_ok=True)
+                if self.total_size is None:
+                    self.total_size = sum(size for _, size, _ in self._scan())
+                old_size = os.path.getsize(path) if os.path.exists(path) else 0
+                with open(path + '.tmp', 'w', encoding='utf-8') as f:
+                    json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+                os.replace(path + '.tmp', path)
+                self.total_size += os.path.getsize(path) - old_size
+                if self.total_size > self.max_bytes:
+                    self._evict(keep=path)
+            except OSError as e:
+                print(f"保存目录索引失败: {e}")
+
+    def _scan(self):
+        """列出存储目录中的所有索引文件 (路径, 大小, 修改时间)"""
+        if not os.path.isdir(self.store_dir):
+            return []
+        files = []
+        for entry in os.scandir(self.store_dir):
+            if not entry.name.endswith('.json'):
+                continue
+            try:
+                stat = entry.stat()
+            except OSError:
+                continue
+            files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self, keep=None):
+        """删除最久未打开的目录索引，直到总大小降到上限的90%，刚保存的索引保留"""
+        files = self._scan()
+        files.sort(key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for listing_file, size, _ in files:
+            if total <= target:
+                break
+            if listing_file == keep:
+                continue
+            try:
+                os.remove(listing_file)
+                total -= size
+            except OSError:
+                continue
+        self.total_size = total
+
+
+class ListingStoreMixin:
+    """持久化目录索引混合类 - 重新打开大目录时直接读取上次的索引，无需等待扫描"""
+
+    def _init_listing_store(self):
+        """初始化目录索引存储，目录位于配置文件旁"""
+        max_bytes = self.config_manager.get_listing_cache_size_mb() * 1024 * 1024
+        self.listing_store = ListingStore(os.path.join(self.config_manager.config_dir, 'listings'), max_bytes)
+        # 图片数量达到该值的目录才保存索引，小目录直接扫描已足够快
+        self.listing_min_images = 500
+        self.listing_save_delay = 1000  # 毫秒
+        self.listing_save_id = None
+
+    def load_directory_listing(self, index):
+        """
+        将保存的索引载入目录索引
+
+        Returns:
+            bool: 保存的索引是否仍然有效（目录修改时间未变），无效时仍会载入以便立即显示
+        """
+        listing = self.listing_store.load(index.directory)
+        if listing is None:
+            return False
+        mtime_ns, entries = listing
+        index.load_entries(entries)
+        return mtime_ns == index.dir_mtime_ns
+
+    def schedule_listing_save(self):
+        """合并短时间内的多次变化后保存当前目录索引"""
+        if self.listing_save_id is not None:
+            self.root.after_cancel(self.listing_save_id)
+        self.listing_save_id = self.root.after(self.listing_save_delay, self._save_directory_listing)
+
+    def _save_directory_listing(self):
+        """
+        在主线程中导出条目，后台线程写入文件
+        扫描未完成的索引不保存，否则尚未扫描到的图片会以当前目录修改时间被记为不存在
+        """
+        self.listing_save_id = None
+        index = self.directory_index
+        if index is None or not index.complete or index.recursive \
+                or len(index) < self.listing_min_images or index.dir_mtime_ns is None:
+            return
+        entries = index.export_entries()
+        threading.Thread(target=self.listing_store.save,
+                         args=(index.directory, index.dir_mtime_ns, entries),
+                         daemon=True).start()
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+内存监控功能模块
+Memory Monitoring Functionality Module
+"""
+
+import psutil
+
+
+class MemoryMonitorMixin:
+    """内存监控混合类 - 定期用进程实际内存校正缓存计数，并根据系统内存压力调整缓存上限"""
+
+    def _init_memory_monitor(self):
+        """记录基线内存并启动定期校正"""
+        self.memory_process = psutil.Process()
+        self.memory_baseline = self.memory_process.memory_info().rss
+        self.memory_check_interval = 5000  # 毫秒
+        # 未统计内存最多占用缓存上限的比例，避免内存碎片导致缓存被压缩为零
+        self.untracked_memory_ratio = 0.25
+        self.root.after(self.memory_check_interval, self.reconcile_memory)
+
+        # 缓存上限调节：上限变化超过滞回比例才生效，增长需连续多次采样确认
+        self.budget_check_interval = 3000  # 毫秒
+        self.budget_hysteresis = 0.1
+        self.budget_grow_samples = 3
+        self.budget_grow_count = 0
+        self.root.after(self.budget_check_interval, self.adjust_memory_budget)
+
+    def compute_memory_budget(self):
+        """根据系统可用内存计算两级缓存的总上限，缓存自身占用的内存也视为可用"""
+        virtual_memory = psutil.virtual_memory()
+        cached = self.image_cache.current_size + self.encoded_cache.current_size
+        return int((virtual_memory.available + cached) * self.cache_ratio)
+
+    def adjust_memory_budget(self):
+        """
+        低频采样系统内存并调整缓存上限
+        内存紧张时立即缩小并淘汰超出部分，内存充裕时需连续确认后才扩大，避免来回振荡
+        """
+        if not self.running:
+            return
+
+        try:
+            target = self.compute_memory_budget()
+            limit = self.get_memory_budget()
+            if target < limit * (1 - self.budget_hysteresis):
+                self.budget_grow_count = 0
+                self.set_memory_budget(target)
+                print(f"系统内存紧张，缓存上限降至 {self.format_memory(target)}")
+            elif target > limit * (1 + self.budget_hysteresis):
+                self.budget_grow_count += 1
+                if self.budget_grow_count >= self.budget_grow_samples:
+                    self.budget_grow_count = 0
+                    self.set_memory_budget(target)
+            else:
+                self.budget_grow_count = 0
+        except psutil.Error as e:
+            print(f"读取系统内存失败: {e}")
+
+        self.root.after(self.budget_check_interval, self.adjust_memory_budget)
+
+    def reconcile_memory(self):
+        """
+        用进程RSS校正缓存计数
+        RSS增长中未被两级缓存和登记占用解释的部分记为未统计内存，计入缓存大小
+        """
+        if not self.running:
+            return
+
+        try:
+            rss = self.memory_process.memory_info().rss
+            # 两级缓存都计入已统计内存，与 compute_memory_budget 的口径一致
+            tracked = (self.image_cache.current_size - self.image_cache.get_reserved('untracked')
+                       + self.encoded_cache.current_size)
+            untracked = max(0, rss - self.memory_baseline - tracked)
+            untracked = min(untracked, int(self.image_cache.limit * self.untracked_memory_ratio))
+            self.image_cache.reserve('untracked', untracked)
+        except psutil.Error as e:
+            print(f"读取进程内存失败: {e}")
+
+        self.root.after(self.memory_check_interval, self.reconcile_memory)
+
+    def get_memory_report(self):
+        """获取内存使用报告"""
+        rss = self.memory_process.memory_info().rss
+        return {
+            'rss': rss,
+            'baseline': self.memory_baseline,
+            'cache_size': self.image_cache.current_size,
+            'cache_limit': self.image_cache.limit,
+            'untracked': self.image_cache.get_reserved('untracked'),
+            'encoded_size': self.encoded_cache.current_size,
+            'encoded_limit': self.encoded_cache.limit
+        }
+
+    def get_cache_stats(self):
+        """获取图片缓存的命中率和淘汰统计，用于比较淘汰策略"""
+        return self.image_cache.stats()
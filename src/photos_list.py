@@ -8,7 +8,7 @@ Photo List Display Functionality Module
 import os
 import tkinter as tk
 from tkinter import ttk
-from PIL import Image, ImageTk
+from PIL import ImageTk
 
 
 class PhotosListMixin:
@@ -104,8 +104,7 @@ class PhotosListMixin:
                     list_dialog.after(50)
 
                 index = int(tree.item(selected_item, "values")[0]) - 1
-                self.current_index = index
-                self.show_current_image()
+                self.jump_to_index(index)
 
                 status_var.set(f"已跳转到: {os.path.basename(self.image_paths[index])}")
                 status_label.config(fg="#228B22")
@@ -122,8 +121,9 @@ class PhotosListMixin:
                 preview_var.set(f"预览: {filename}")
 
                 try:
-                    img = Image.open(self.image_paths[index])
-                    img.thumbnail((150, 150))
+                    img = self.get_thumbnail(self.image_paths[index])
+                    if img is None:
+                        raise ValueError("缩略图生成失败")
                     photo = ImageTk.PhotoImage(img)
                     preview_image.config(image=photo)
                     preview_image.image = photo
@@ -160,8 +160,7 @@ class PhotosListMixin:
             try:
                 index = int(index_entry.get()) - 1
                 if 0 <= index < len(self.image_paths):
-                    self.current_index = index
-                    self.show_current_image()
+                    self.jump_to_index(index)
                     tree.selection_set(tree.get_children()[index])
                     tree.see(tree.get_children()[index])
 
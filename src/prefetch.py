@@ -0,0 +1,359 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片预加载功能模块
+Image Prefetch Functionality Module
+"""
+
+import os
+import math
+import time
+import heapq
+import itertools
+import threading
+
+
+class PrefetchJob:
+    """预加载任务"""
+
+    __slots__ = ('path', 'index', 'priority', 'cancelled')
+
+    def __init__(self, path, index, priority):
+        self.path = path
+        self.index = index
+        self.priority = priority
+        self.cancelled = False
+
+
+class PrefetchPool:
+    """固定大小的解码线程池 - 按优先级执行任务，可取消过期任务"""
+
+    def __init__(self, worker, max_workers=None):
+        """
+        初始化预加载线程池
+
+        Args:
+            worker: 任务执行函数，接收图片路径
+            max_workers: 工作线程数量，默认根据CPU核心数确定
+        """
+        self.worker = worker
+        self.max_workers = max_workers or max(1, min(4, (os.cpu_count() or 2) - 1))
+        self.condition = threading.Condition()
+
+        # 优先级堆：(优先级, 序号, 任务)，数值越小越先执行
+        self._heap = []
+        self._seq = itertools.count()
+        # 路径 -> 排队中的任务
+        self._queued = {}
+        self._threads = []
+        self._shutdown = False
+
+        # 统计信息
+        self.running = 0
+        self.cancelled = 0
+        self.completed = 0
+
+    def submit(self, path, index, priority):
+        """
+        提交预加载任务，同一路径已在排队时只保留优先级更高的一个
+
+        Args:
+            path: 图片路径
+            index: 图片在列表中的索引
+            priority: 优先级，数值越小越先执行
+        """
+        with self.condition:
+            if self._shutdown:
+                return None
+
+            existing = self._queued.get(path)
+            if existing is not None:
+                existing.index = index
+                if existing.priority <= priority:
+                    return existing
+                # 以更高优先级重新入队，旧条目出堆时被跳过
+                existing.cancelled = True
+
+            job = PrefetchJob(path, index, priority)
+            self._queued[path] = job
+            heapq.heappush(self._heap, (priority, next(self._seq), job))
+            self._ensure_workers()
+            self.condition.notify()
+            return job
+
+    def cancel_stale(self, keep_indices):
+        """取消所有索引不在保留集合中的排队任务"""
+        with self.condition:
+            for path, job in list(self._queued.items()):
+                if job.index not in keep_indices:
+                    job.cancelled = True
+                    del self._queued[path]
+                    self.cancelled += 1
+
+    def cancel_all(self):
+        """取消所有排队任务"""
+        self.cancel_stale(())
+
+    def stats(self):
+        """获取任务统计：排队、运行、取消、完成数量"""
+        with self.condition:
+            return {
+                'queued': len(self._queued),
+                'running': self.running,
+                'cancelled': self.cancelled,
+                'completed': self.completed
+            }
+
+    def shutdown(self):
+        """停止线程池，丢弃所有排队任务"""
+        with self.condition:
+            self._shutdown = True
+            self._heap.clear()
+            self._queued.clear()
+            self.condition.notify_all()
+
+    def _ensure_workers(self):
+        """按需启动工作线程（需持有锁）"""
+        while len(self._threads) < self.max_workers:
+            thread = threading.Thread(target=self._run, daemon=True)
+            self._threads.append(thread)
+            thread.start()
+
+    def _run(self):
+        """工作线程主循环"""
+        while True:
+            with self.condition:
+                while not self._heap and not self._shutdown:
+                    self.condition.wait()
+                if self._shutdown:
+                    return
+                _, _, job = heapq.heappop(self._heap)
+                if job.cancelled:
+                    continue
+                del self._queued[job.path]
+                self.running += 1
+
+            try:
+                self.worker(job.path)
+            except Exception as e:
+                print(f"预加载失败 {job.path}: {e}")
+            finally:
+                with self.condition:
+                    self.running -= 1
+                    self.completed += 1
+
+
+class PrefetchPlanner:
+    """预加载窗口规划器 - 根据浏览方向、速度、解码吞吐量和缓存预算确定预加载范围"""
+
+    def __init__(self, ahead=3, behind=1, max_ahead=12):
+        """
+        初始化预加载规划器
+
+        Args:
+            ahead: 浏览方向上的基础预加载数量
+            behind: 反方向的预加载数量
+            max_ahead: 浏览方向上的最大预加载数量
+        """
+        self.lock = threading.Lock()
+        self.base_ahead = max(1, ahead)
+        self.behind = max(0, behind)
+        self.max_ahead = max(self.base_ahead, max_ahead)
+
+        # 超过该时间未导航则认为已停止浏览
+        self.idle_timeout = 1.5
+        # 指数滑动平均系数
+        self.smoothing = 0.3
+
+        self.direction = 1
+        self.velocity = 0.0  # 实测导航速度（张/秒）
+        self.repeat_velocity = 0.0  # 按键重复的预期速度（张/秒）
+        self.decode_time = 0.0  # 平均解码耗时（秒）
+        self._last_index = None
+        self._last_time = 0.0
+
+    def record_navigation(self, index):
+        """记录一次导航，更新方向和速度"""
+        now = time.monotonic()
+        with self.lock:
+            if self._last_index is not None and index != self._last_index:
+                step = index - self._last_index
+                self.direction = 1 if step > 0 else -1
+                elapsed = now - self._last_time
+                if abs(step) != 1 or elapsed > self.idle_timeout or elapsed <= 0:
+                    # 跳转或停顿后重新开始测速
+                    self.velocity = 0.0
+                else:
+                    current = 1.0 / elapsed
+                    if self.velocity:
+                        current = self.velocity + self.smoothing * (current - self.velocity)
+                    self.velocity = current
+            self._last_index = index
+            self._last_time = now
+
+    def set_repeat_delay(self, delay_ms):
+        """记录按键重复间隔（毫秒），None表示停止重复"""
+        with self.lock:
+            self.repeat_velocity = 1000.0 / delay_ms if delay_ms else 0.0
+
+    def record_decode(self, seconds):
+        """记录一次解码耗时"""
+        with self.lock:
+            if self.decode_time:
+                self.decode_time += self.smoothing * (seconds - self.decode_time)
+            else:
+                self.decode_time = seconds
+
+    def current_velocity(self):
+        """当前有效浏览速度（张/秒）"""
+        with self.lock:
+            if time.monotonic() - self._last_time > self.idle_timeout:
+                return self.repeat_velocity
+            return max(self.velocity, self.repeat_velocity)
+
+    def window_size(self, entry_size=0, budget=0):
+        """
+        计算前向和后向预加载数量
+
+        Args:
+            entry_size: 平均每张图片占用的缓存大小
+            budget: 缓存大小上限
+
+        Returns:
+            tuple: (前向数量, 后向数量)
+        """
+        velocity = self.current_velocity()
+        with self.lock:
+            decode_time = self.decode_time
+        ahead = self.base_ahead
+        behind = self.behind
+
+        # 解码一张图片期间会翻过的张数，需要额外提前准备
+        if velocity and decode_time:
+            ahead += math.ceil(velocity * decode_time)
+        ahead = min(ahead, self.max_ahead)
+
+        # 预加载最多占用一半缓存，避免淘汰当前图片附近的内容
+        if entry_size > 0 and budget > 0:
+            capacity = int(budget * 0.5 // entry_size)
+            behind = min(behind, max(0, capacity - 1))
+            ahead = min(ahead, max(1, capacity - behind))
+
+        return ahead, behind
+
+    def plan(self, current_index, total, entry_size=0, budget=0):
+        """
+        按优先级生成预加载索引列表
+
+        Args:
+            current_index: 当前图片索引
+            total: 图片总数
+            entry_size: 平均每张图片占用的缓存大小
+            budget: 缓存大小上限
+
+        Returns:
+            list: 预加载索引，越靠前优先级越高
+        """
+        ahead, behind = self.window_size(entry_size, budget)
+        direction = self.direction
+
+        forward = [current_index + direction * i for i in range(1, ahead + 1)]
+        backward = [current_index - direction * i for i in range(1, behind + 1)]
+        # 下一张最优先，其次是紧邻的上一张，然后是更远的前向图片
+        ordered = forward[:1] + backward[:1] + forward[1:] + backward[1:]
+        return [idx for idx in ordered if 0 <= idx < total]
+
+    def warming_order(self, current_index, total):
+        """
+        从当前图片向两侧交替生成目录中的索引，用于后台预热，不对整个目录排序
+        浏览方向上的图片优先，反方向的距离按两倍计算
+
+        Args:
+            current_index: 当前图片索引
+            total: 图片总数
+
+        Yields:
+            int: 按预热顺序的索引
+        """
+        if not total:
+            return
+        direction = self.direction
+        # 浏览方向和反方向上剩余的图片数量
+        ahead = total - current_index if direction > 0 else current_index + 1
+        behind = total - ahead
+        forward, backward = 0, 1
+        while forward < ahead or backward <= behind:
+            if forward < ahead and (backward > behind or forward <= 2 * backward):
+                yield current_index + forward * direction
+                forward += 1
+            else:
+                yield current_index - backward * direction
+                backward += 1
+
+
+class PrefetchMixin:
+    """图片预加载混合类"""
+
+    def _init_prefetch(self):
+        """初始化预加载线程池和窗口规划器"""
+        ahead, behind = 3, 1
+        if hasattr(self, 'config_manager'):
+            ahead, behind = self.config_manager.get_prefetch_window()
+        self.prefetch_planner = PrefetchPlanner(ahead, behind)
+        self.prefetch_pool = PrefetchPool(self._prefetch_worker)
+
+    def _prefetch_worker(self, path):
+        """预加载任务：加载图片并记录解码耗时"""
+        if path in self.image_cache:
+            return
+        start = time.monotonic()
+        if self.load_image_to_cache(path):
+            self.prefetch_planner.record_decode(time.monotonic() - start)
+
+    def plan_prefetch(self):
+        """根据浏览方向和速度规划当前图片周围的预加载索引"""
+        return self.prefetch_planner.plan(
+            self.current_index,
+            len(self.image_paths),
+            self.image_cache.average_entry_size(),
+            self.image_cache.limit
+        )
+
+    def schedule_prefetch(self, indices):
+        """
+        按顺序为指定索引安排预加载，越靠前优先级越高，接近目录首尾时再加上相邻目录的边界图片
+        不在本次列表中的排队任务会被取消，当前图片和预加载窗口固定在缓存中
+
+        Args:
+            indices: 需要预加载的图片索引
+        """
+        wanted = {}
+        for idx in indices:
+            if not 0 <= idx < len(self.image_paths) or idx == self.current_index:
+                continue
+            wanted.setdefault(idx, len(wanted))
+
+        boundary = self.folder_boundary_paths()
+        self.prefetch_pool.cancel_stale(wanted)
+        pinned = [self.image_paths[self.current_index]] + [self.image_paths[idx] for idx in wanted] + boundary
+        self.image_cache.set_pinned(pinned)
+
+        # 已缓存的占位预览图进入窗口后按原文件重新解码，当前图片优先
+        for priority, path in enumerate(pinned):
+            if path in self.preview_placeholders:
+                self.preview_refine_pool.submit(path, -1, priority)
+
+        for idx, priority in wanted.items():
+            path = self.image_paths[idx]
+            if path in self.image_cache:
+                continue
+            self.prefetch_pool.submit(path, idx, priority)
+
+        # 相邻目录的图片不在当前列表中，索引记为-1，下次安排时重新提交
+        for priority, path in enumerate(boundary, len(wanted)):
+            if path not in self.image_cache:
+                self.prefetch_pool.submit(path, -1, priority)
+
+    def get_prefetch_stats(self):
+        """获取预加载统计信息"""
+        return self.prefetch_pool.stats()
@@ -0,0 +1,190 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+持久化预览图缓存模块
+Persistent Preview Cache Module
+"""
+
+import io
+import os
+import queue
+import hashlib
+import threading
+from PIL import Image
+from .prefetch import PrefetchPool
+
+
+class PreviewCache:
+    """磁盘预览图缓存 - 按路径、文件大小和修改时间保存屏幕尺寸预览图与缩略图"""
+
+    PREVIEW = 'p'
+    THUMBNAIL = 't'
+
+    def __init__(self, cache_dir, max_bytes=512 * 1024 * 1024, thumbnail_size=(150, 150), quality=90):
+        """
+        初始化预览图缓存
+
+        Args:
+            cache_dir: 缓存目录
+            max_bytes: 缓存目录大小上限（字节）
+            thumbnail_size: 缩略图最大尺寸
+            quality: JPEG编码质量
+        """
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.quality = quality
+        self.lock = threading.Lock()
+
+        # 缓存目录当前大小，写入线程启动后统计
+        self.total_size = None
+        self._queue = queue.Queue()
+        self._writer = None
+
+    def _key(self, path):
+        """根据路径、文件大小和修改时间生成缓存键"""
+        stat = os.stat(path)
+        raw = f"{os.path.normcase(os.path.abspath(path))}|{stat.st_size}|{stat.st_mtime_ns}"
+        return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+    def _file_for(self, key, kind):
+        """缓存文件路径，按键的前两位分子目录"""
+        return os.path.join(self.cache_dir, key[:2], f"{key}_{kind}.jpg")
+
+    def get(self, path, kind):
+        """
+        读取缓存的预览图或缩略图
+
+        Returns:
+            Image: 已解码的灰度或RGB图片，未命中时返回None
+        """
+        try:
+            cache_file = self._file_for(self._key(path), kind)
+            result = Image.open(cache_file)
+            result.load()
+            if result.mode not in ('L', 'RGB'):
+                converted = result.convert('RGB')
+                result.close()
+                result = converted
+            # 更新修改时间作为LRU访问记录
+            os.utime(cache_file)
+            return result
+        except OSError:
+            return None
+
+    def put(self, path, img, kind):
+        """编码图片并交给后台线程写入缓存目录，JPEG无法保存的模式（如带透明通道）不缓存"""
+        if img.mode not in ('L', 'RGB'):
+            return
+        try:
+            key = self._key(path)
+        except OSError:
+            return
+        buffer = io.BytesIO()
+        img.save(buffer, format='JPEG', quality=self.quality)
+        self._queue.put((self._file_for(key, kind), buffer.getvalue()))
+        self._ensure_writer()
+
+    def get_preview(self, path):
+        """读取屏幕尺寸预览图"""
+        return self.get(path, self.PREVIEW)
+
+    def put_preview(self, path, img):
+        """保存屏幕尺寸预览图"""
+        self.put(path, img, self.PREVIEW)
+
+    def get_thumbnail(self, path):
+        """读取缩略图，未命中时从原图生成并保存"""
+        thumbnail = self.get(path, self.THUMBNAIL)
+        if thumbnail is not None:
+            return thumbnail
+
+        with Image.open(path) as img:
+            img.draft('RGB', self.thumbnail_size)
+            img.thumbnail(self.thumbnail_size)
+            thumbnail = img.convert('RGB')
+        self.put(path, thumbnail, self.THUMBNAIL)
+        return thumbnail
+
+    def _ensure_writer(self):
+        """按需启动写入线程"""
+        with self.lock:
+            if self._writer is None:
+                self._writer = threading.Thread(target=self._write_loop, daemon=True)
+                self._writer.start()
+
+    def _write_loop(self):
+        """写入线程：统计目录大小，依次写入缓存文件并控制总大小"""
+        self.total_size = sum(size for _, size, _ in self._scan())
+        while True:
+            cache_file, data = self._queue.get()
+            try:
+                os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+                with open(cache_file, 'wb') as f:
+                    f.write(data)
+                self.total_size += len(data)
+                if self.total_size > self.max_bytes:
+                    self._evict()
+            except OSError as e:
+                print(f"写入预览缓存失败: {e}")
+
+    def _scan(self):
+        """列出缓存目录中的所有文件 (路径, 大小, 修改时间)"""
+        if not os.path.isdir(self.cache_dir):
+            return []
+        files = []
+        for sub_entry in os.scandir(self.cache_dir):
+            if not sub_entry.is_dir():
+                continue
+            for entry in os.scandir(sub_entry.path):
+                try:
+                    stat = entry.stat()
+                except OSError:
+                    continue
+                files.append((entry.path, stat.st_size, stat.st_mtime))
+        return files
+
+    def _evict(self):
+        """删除最久未访问的缓存文件，直到总大小降到上限的90%"""
+        files = self._scan()
+        files.sort(key=lambda item: item[2])
+        total = sum(size for _, size, _ in files)
+        target = self.max_bytes * 0.9
+        for cache_file, size, _ in files:
+            if total <= target:
+                break
+            try:
+                os.remove(cache_file)
+                total -= size
+            except OSError:
+                continue
+        self.total_size = total
+
+
+class PreviewCacheMixin:
+    """持久化预览图缓存混合类"""
+
+    def _init_preview_cache(self):
+        """初始化预览图缓存，目录位于配置文件旁"""
+        cache_dir = os.path.join(self.config_manager.config_dir, 'previews')
+        max_bytes = self.config_manager.get_preview_cache_size_mb() * 1024 * 1024
+        self.preview_cache = PreviewCache(cache_dir, max_bytes)
+        # 路径 -> 作为占位显示的预览图，进入预加载窗口后由单线程按原文件重新解码替换
+        self.preview_placeholders = {}
+        self.preview_refine_pool = PrefetchPool(self._refine_preview, max_workers=1)
+
+    def cancel_preview_refinement(self):
+        """取消排队中的预览图重新解码任务，并丢弃已不在缓存中的占位记录"""
+        self.preview_refine_pool.cancel_all()
+        for path, preview in list(self.preview_placeholders.items()):
+            entry = self.image_cache.get_entry(path)
+            if entry is None or entry.image is not preview:
+                self.preview_placeholders.pop(path, None)
+
+    def get_thumbnail(self, path):
+        """获取图片缩略图，失败时返回None"""
+        try:
+            return self.preview_cache.get_thumbnail(path)
+        except Exception as e:
+            print(f"无法生成缩略图 {path}: {e}")
+            return None
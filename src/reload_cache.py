@@ -15,11 +15,20 @@ class ReloadCacheMixin:
             print("当前没有加载任何图片或目录")
             return
 
-        # 清空当前缓存
-        self.release_all_images()
-        print("正在重载内存...")
+        # 重载前输出缓存统计，便于比较不同淘汰策略
+        print(self.format_cache_stats())
 
-        # 重新加载目录中的图片
-        self.load_directory_images(self.last_directory)
+        # 只移除文件已修改或删除的缓存项，其余图片继续复用
+        removed = self.image_cache.revalidate()
+        print(f"正在重载内存，已移除 {removed} 张已变更的图片...")
+
+        # 重新扫描目录，保持当前图片
+        self.load_directory_images(self.last_directory, self.image_paths[self.current_index])
         self.show_current_image()
-        print(f"内存重载完成，当前缓存大小: {self.format_memory(self.current_cache_size)}")
\ No newline at end of file
+        print(f"内存重载完成，当前缓存大小: {self.format_memory(self.image_cache.current_size)}")
+
+    def format_cache_stats(self):
+        """缓存统计的显示文本：淘汰策略、命中率和淘汰次数"""
+        stats = self.image_cache.stats()
+        return (f"缓存统计（{stats['policy']}）：命中率 {stats['hit_ratio']:.1%}"
+                f"（命中 {stats['hits']} / 未命中 {stats['misses']}），淘汰 {stats['evictions']} 张")
\ No newline at end of file
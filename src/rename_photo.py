@@ -56,16 +56,11 @@ class RenamePhotoMixin:
                 os.rename(current_path, new_path)
 
                 # 更新缓存中的引用
-                if current_path in self.image_cache:
-                    img_data = self.image_cache.pop(current_path)
-                    self.image_cache[new_path] = img_data
+                self.image_cache.rename(current_path, new_path)
+                self.encoded_cache.rename(current_path, new_path)
 
-                    del self.lru_list[current_path]
-                    self.lru_list[new_path] = True
-                    self.lru_list.move_to_end(new_path)
-
-                # 更新图片路径列表和窗口标题
-                self.image_paths[self.current_index] = new_path
+                # 更新目录索引（按新名称移动到对应位置）和窗口标题
+                self.current_index = self.directory_index.rename(current_path, new_path)
                 print(f"已重命名: {current_path} -> {new_path}")
                 self.root.title(f"图片查看器 - {os.path.basename(new_path)}")
 
@@ -27,23 +27,15 @@ class ResetCacheMixin:
 
     def release_all_images(self):
         """释放所有图片缓存"""
-        for path in list(self.image_cache.keys()):
-            img, size = self.image_cache.pop(path)
-            img.close()
-        self.lru_list.clear()
-        self.current_cache_size = 0
+        self.prefetch_pool.cancel_all()
+        self.preview_refine_pool.cancel_all()
+        self.preview_placeholders.clear()
+        self.image_cache.clear()
+        self.encoded_cache.clear()
         self.canvas.delete("all")
         self.canvas.image = None
-
-    def remove_oldest_image(self):
-        """移除最旧的图片缓存"""
-        if self.lru_list:
-            oldest_path = next(iter(self.lru_list))
-            if oldest_path in self.image_cache:
-                img, size = self.image_cache.pop(oldest_path)
-                img.close()
-                del self.lru_list[oldest_path]
-                self.current_cache_size -= size
+        self.render_buffer = None
+        self.image_cache.reserve('photo_image', 0)
 
     @staticmethod
     def format_memory(size):
@@ -87,27 +87,29 @@ class ColorDetector:
         """
         width, height = img.size
         edge_colors = []
+        # 调色板图片的像素值是调色板索引
+        palette = img.getpalette() if img.mode == 'P' else None
 
         try:
             # 采样上边缘
             for x in range(0, width, sample_density):
                 pixel = img.getpixel((x, 0))
-                edge_colors.append(self._normalize_pixel(pixel))
+                edge_colors.append(self._normalize_pixel(pixel, palette))
 
             # 采样下边缘
             for x in range(0, width, sample_density):
                 pixel = img.getpixel((x, height - 1))
-                edge_colors.append(self._normalize_pixel(pixel))
+                edge_colors.append(self._normalize_pixel(pixel, palette))
 
             # 采样左边缘
             for y in range(0, height, sample_density):
                 pixel = img.getpixel((0, y))
-                edge_colors.append(self._normalize_pixel(pixel))
+                edge_colors.append(self._normalize_pixel(pixel, palette))
 
             # 采样右边缘
             for y in range(0, height, sample_density):
                 pixel = img.getpixel((width - 1, y))
-                edge_colors.append(self._normalize_pixel(pixel))
+                edge_colors.append(self._normalize_pixel(pixel, palette))
 
         except Exception as e:
             print(f"边缘采样失败: {e}")
@@ -116,16 +118,20 @@ class ColorDetector:
 
         return edge_colors
 
-    def _normalize_pixel(self, pixel):
+    def _normalize_pixel(self, pixel, palette=None):
         """
         标准化像素颜色为RGB元组
 
         Args:
             pixel: 像素值（可能是单值、元组等）
+            palette: 调色板图片的RGB调色板
 
         Returns:
             tuple: RGB颜色元组
         """
+        if palette is not None and isinstance(pixel, int):
+            # 调色板图像
+            return tuple(palette[pixel * 3:pixel * 3 + 3])
         if isinstance(pixel, (int, float)):
             # 灰度图像
             val = int(pixel)
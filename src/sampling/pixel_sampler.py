@@ -86,7 +86,8 @@ class PixelSampler:
             pixel = img.getpixel((x, y))
 
             # 处理不同的图像模式
-            rgb = self._normalize_pixel_to_rgb(pixel, img.mode)
+            palette = img.getpalette() if img.mode == 'P' else None
+            rgb = self._normalize_pixel_to_rgb(pixel, img.mode, palette)
 
             # 添加到历史记录
             if rgb:
@@ -161,6 +162,7 @@ class PixelSampler:
         try:
             total_r = total_g = total_b = 0
             sample_count = 0
+            palette = img.getpalette() if img.mode == 'P' else None
 
             # 采样区域内的像素
             for dx in range(-radius, radius + 1):
@@ -171,7 +173,7 @@ class PixelSampler:
                     # 检查坐标是否在图像范围内
                     if 0 <= x < img.width and 0 <= y < img.height:
                         pixel = img.getpixel((x, y))
-                        rgb = self._normalize_pixel_to_rgb(pixel, img.mode)
+                        rgb = self._normalize_pixel_to_rgb(pixel, img.mode, palette)
 
                         if rgb:
                             total_r += rgb[0]
@@ -190,13 +192,14 @@ class PixelSampler:
 
         return None
 
-    def _normalize_pixel_to_rgb(self, pixel, mode):
+    def _normalize_pixel_to_rgb(self, pixel, mode, palette=None):
         """
         将像素值标准化为RGB元组
 
         Args:
             pixel: 像素值
             mode: 图像模式
+            palette: 调色板模式图像的RGB调色板
 
         Returns:
             tuple: RGB颜色元组
@@ -227,9 +230,11 @@ class PixelSampler:
                     r, g, b = colorsys.hsv_to_rgb(h / 360, s / 100, v / 100)
                     return (int(r * 255), int(g * 255), int(b * 255))
             elif mode == 'P':
-                # 调色板模式，需要获取调色板
+                # 调色板模式，按索引查调色板
                 if isinstance(pixel, int):
-                    # 简化处理，返回灰度值
+                    if palette is not None:
+                        return tuple(palette[pixel * 3:pixel * 3 + 3])
+                    # 没有调色板时按灰度处理
                     return (pixel, pixel, pixel)
 
             # 默认处理
@@ -25,6 +25,10 @@ class ShortcutKeyMixin:
         # Alt+P - 播放开始/暂停
         self.root.bind('<Alt-p>', self.shortcut_toggle_playback)
 
+        # Ctrl+左/右 - 上一个/下一个目录
+        self.root.bind('<Control-Left>', self.shortcut_previous_folder)
+        self.root.bind('<Control-Right>', self.shortcut_next_folder)
+
         # 设置取色器事件绑定
         self.setup_sampling_events()
 
@@ -34,6 +38,7 @@ class ShortcutKeyMixin:
         print("  Ctrl+C    - 复制图片本体")
         print("  Alt+C     - 复制图片路径")
         print("  Alt+P     - 播放/暂停")
+        print("  Ctrl+←/→  - 上一个/下一个目录")
         print("  Ctrl+Alt  - 取色器模式（按住激活）")
 
     def shortcut_open_image(self, event=None):
@@ -70,4 +75,16 @@ class ShortcutKeyMixin:
             print(f"快捷键: {status}")
         except Exception as e:
             print(f"切换播放状态失败: {e}")
-        return "break"
\ No newline at end of file
+        return "break"
+
+    def shortcut_previous_folder(self, event=None):
+        """快捷键：切换到上一个目录"""
+        if not self.is_playing:
+            self.navigate_folder("prev")
+        return "break"
+
+    def shortcut_next_folder(self, event=None):
+        """快捷键：切换到下一个目录"""
+        if not self.is_playing:
+            self.navigate_folder("next")
+        return "break"
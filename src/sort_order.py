@@ -0,0 +1,89 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+图片排序功能模块
+Image Sort Order Functionality Module
+"""
+
+import time
+import threading
+from .directory_index import SORT_ORDERS, METADATA_ORDERS, probe_metadata
+
+
+class SortOrderMixin:
+    """图片排序混合类 - 切换目录索引的排序方式，并在后台补全排序所需的图片头部信息"""
+
+    def set_sort_order(self, order):
+        """
+        切换排序方式，当前图片保持不变
+
+        Args:
+            order: 排序方式，SORT_ORDERS 中的键
+        """
+        if order not in SORT_ORDERS:
+            return
+        self.sort_order = order
+        self.sort_order_var.set(order)
+        self.save_sort_order_config(order)
+        print(f"排序方式: {SORT_ORDERS[order]}")
+
+        if self.directory_index is None:
+            return
+        current_path = self.image_paths[self.current_index] if self.image_paths else None
+        if self.directory_index.set_order(order):
+            self.follow_current_path(current_path)
+            self.start_background_warming()
+        self.start_metadata_probe()
+
+    def start_metadata_probe(self):
+        """当前排序需要图片尺寸或拍摄日期时，在后台读取尚未记录的图片头部信息"""
+        self.metadata_generation += 1
+        index = self.directory_index
+        if index is None or index.order not in METADATA_ORDERS:
+            return
+        missing = index.missing_metadata()
+        if not missing:
+            return
+
+        # 从当前图片附近开始读取，先稳定用户正在查看的区域
+        start = min(self.current_index, len(missing) - 1)
+        missing = missing[start:] + missing[:start]
+        threading.Thread(target=self._probe_metadata,
+                         args=(index, missing, self.metadata_generation),
+                         daemon=True).start()
+
+    def _probe_metadata(self, index, paths, generation):
+        """后台读取图片头部信息，分批交给主线程更新索引"""
+        batch = []
+        last_flush = time.monotonic()
+        for path in paths:
+            if generation != self.metadata_generation:
+                return
+            try:
+                meta = probe_metadata(path)
+            except Exception:
+                # 无法读取的图片按未知尺寸和日期排序，不再重复尝试
+                meta = (0, 0, '')
+            batch.append((path, meta))
+
+            now = time.monotonic()
+            if len(batch) >= 512 or now - last_flush > 0.5:
+                self.root.after(0, self._merge_metadata, index, generation, batch)
+                batch = []
+                last_flush = now
+
+        self.root.after(0, self._merge_metadata, index, generation, batch, True)
+
+    def _merge_metadata(self, index, generation, batch, finished=False):
+        """将一批头部信息并入目录索引，保持当前图片不变"""
+        if generation != self.metadata_generation or index is not self.directory_index:
+            return
+
+        current_path = self.image_paths[self.current_index] if self.image_paths else None
+        if index.update_metadata(batch):
+            self.follow_current_path(current_path)
+
+        if finished:
+            print(f"已按{SORT_ORDERS[index.order]}排序，共 {len(self.image_paths)} 张图片")
+            # 读取到的尺寸和拍摄日期随目录索引保存，下次按同样方式排序时无需再读取
+            self.schedule_listing_save()
@@ -19,6 +19,7 @@ class NavigationMixin:
         else:
             self.current_index = min(max_index, self.current_index + 1)
 
+        self.prefetch_planner.record_navigation(self.current_index)
         self.zoom_factor = 1.0
         self.show_current_image()
 
@@ -30,6 +31,16 @@ class NavigationMixin:
         self.last_navigate_time = current_time
         return True
 
+    def jump_to_index(self, index):
+        """跳转到指定图片，并以新位置为中心重新开始后台预热"""
+        if not 0 <= index < len(self.image_paths):
+            return
+        self.current_index = index
+        self.prefetch_planner.record_navigation(index)
+        self.zoom_factor = 1.0
+        self.show_current_image()
+        self.start_background_warming()
+
     def enable_navigation(self):
         """启用导航功能"""
         if not self.is_playing:
@@ -59,6 +70,7 @@ class NavigationMixin:
 
             acceleration_factor = min(0.5, step / 30.0)
             new_delay = max(self.min_delay, int(self.max_delay * (1 - acceleration_factor * self.speed_boost)))
+            self.prefetch_planner.set_repeat_delay(new_delay)
 
             self.repeat_id = self.root.after(new_delay, lambda: repeat(new_delay, step + 1))
 
@@ -70,6 +82,7 @@ class NavigationMixin:
     def stop_repeat(self):
         """停止重复导航操作"""
         self.auto_press = False
+        self.prefetch_planner.set_repeat_delay(None)
         if self.repeat_id:
             self.root.after_cancel(self.repeat_id)
             self.repeat_id = None
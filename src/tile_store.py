@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+超大图片瓦片存储模块
+Tiled Image Store Module
+"""
+
+import mmap
+import tempfile
+import threading
+from collections import OrderedDict
+from PIL import Image
+from .image_cache import ImageCache, IDENTITY_TRANSFORM, invert_transform, pixel_size, release_source
+
+
+class TileStore:
+    """瓦片存储 - 将超大图片切成多级固定尺寸瓦片，保存在内存映射的临时文件中"""
+
+    def __init__(self, full_size, mode='RGB', tile_size=512, memory_budget=64 * 1024 * 1024):
+        """
+        初始化瓦片存储
+
+        Args:
+            full_size: 原图尺寸 (宽, 高)
+            mode: 瓦片模式，'L' 或 'RGB'
+            tile_size: 瓦片边长（像素）
+            memory_budget: 内存中缓存瓦片的大小上限（字节）
+        """
+        self.full_size = full_size
+        self.mode = mode
+        self.tile_size = tile_size
+        self.memory_budget = memory_budget
+        # 临时文件中每像素的字节数与Pillow内存中每像素的字节数
+        self.channels = len(mode)
+        self.pixel_bytes = pixel_size(mode)
+        self.tile_bytes = tile_size * tile_size * self.channels
+        self.lock = threading.Lock()
+
+        # 各层级：(宽, 高, 列数, 行数, 起始槽位)，第k层为原图缩小 2^k 倍
+        self.levels = []
+        slot = 0
+        for width, height in self.level_sizes(full_size, tile_size):
+            cols = -(-width // tile_size)
+            rows = -(-height // tile_size)
+            self.levels.append((width, height, cols, rows, slot))
+            slot += cols * rows
+
+        self._file = tempfile.TemporaryFile(prefix='photosviewer_tiles_')
+        self._file.truncate(slot * self.tile_bytes)
+        self._mmap = mmap.mmap(self._file.fileno(), slot * self.tile_bytes)
+
+        # (层级, 列, 行) -> 瓦片图片，LRU顺序
+        self._tiles = OrderedDict()
+        self._cached_bytes = 0
+
+    @staticmethod
+    def level_sizes(full_size, tile_size=512):
+        """各层级的尺寸，逐级缩小一半，直到一个瓦片能容纳整层"""
+        width, height = full_size
+        sizes = [(width, height)]
+        while width > tile_size or height > tile_size:
+            width = -(-width // 2)
+            height = -(-height // 2)
+            sizes.append((width, height))
+        return sizes
+
+    @staticmethod
+    def decode(path):
+        """
+        解码用于切瓦片的图片，二值和灰度图片按灰度，其余按RGB
+
+        Args:
+            path: 图片路径或文件对象
+        """
+        img = Image.open(path)
+        mode = 'L' if img.mode in ('1', 'L') else 'RGB'
+        try:
+            img.load()
+        except Exception:
+            img.close()
+            raise
+        release_source(img)
+        if img.mode != mode:
+            converted = img.convert(mode)
+            img.close()
+            img = converted
+        return img
+
+    @classmethod
+    def make_overview(cls, img, target_size, max_overview_size=None):
+        """
+        由解码后的图片直接缩小得到概览图，不必等待瓦片写入完成
+
+        Args:
+            img: decode 得到的图片
+            target_size: 显示目标尺寸 (宽, 高)，用于选择概览图层级
+            max_overview_size: 概览图的大小上限（字节），为None时不限制
+
+        Returns:
+            Image: 仍能铺满目标尺寸的最小层级，超出大小上限时改用不超过上限的最大层级
+        """
+        full_width, full_height = img.size
+        fit = min(1.0, target_size[0] / full_width, target_size[1] / full_height)
+        chosen = None
+        sizes = cls.level_sizes(img.size)
+        for level, (width, height) in enumerate(sizes):
+            covers = width >= full_width * fit and height >= full_height * fit
+            fits = max_overview_size is None or ImageCache.predict_size(img.mode, (width, height)) <= max_overview_size
+            if fits and (covers or chosen is None):
+                chosen = level
+        if chosen is None:
+            chosen = len(sizes) - 1
+        return img.reduce(1 << chosen) if chosen else img.copy()
+
+    @classmethod
+    def from_image(cls, img, memory_budget=64 * 1024 * 1024):
+        """
+        将 decode 得到的图片写入所有层级的瓦片，完成后关闭图片
+
+        Args:
+            img: decode 得到的图片
+            memory_budget: 内存中缓存瓦片的大小上限（字节）
+        """
+        try:
+            store = cls(img.size, img.mode, memory_budget=memory_budget)
+        except Exception:
+            img.close()
+            raise
+        try:
+            for level in range(len(store.levels)):
+                if level:
+                    reduced = img.reduce(2)
+                    img.close()
+                    img = reduced
+                store._write_level(level, img)
+        except Exception:
+            store.close()
+            raise
+        finally:
+            img.close()
+        return store
+
+    def _write_level(self, level, img):
+        """将一个层级的图片切成瓦片写入临时文件"""
+        width, height, cols, rows, first_slot = self.levels[level]
+        for row in range(rows):
+            for col in range(cols):
+                x = col * self.tile_size
+                y = row * self.tile_size
+                tile = img.crop((x, y, min(width, x + self.tile_size), min(height, y + self.tile_size)))
+                offset = (first_slot + row * cols + col) * self.tile_bytes
+                data = tile.tobytes()
+                self._mmap[offset:offset + len(data)] = data
+                tile.close()
+
+    def get_tile(self, level, col, row):
+        """读取一个瓦片，优先使用内存中的缓存"""
+        key = (level, col, row)
+        with self.lock:
+            tile = self._tiles.get(key)
+            if tile is not None:
+                self._tiles.move_to_end(key)
+                return tile
+
+            width, height, cols, rows, first_slot = self.levels[level]
+            tile_width = min(self.tile_size, width - col * self.tile_size)
+            tile_height = min(self.tile_size, height - row * self.tile_size)
+            offset = (first_slot + row * cols + col) * self.tile_bytes
+            data = self._mmap[offset:offset + tile_width * tile_height * self.channels]
+            tile = Image.frombytes(self.mode, (tile_width, tile_height), data)
+
+            self._tiles[key] = tile
+            self._cached_bytes += tile_width * tile_height * self.pixel_bytes
+            while self._cached_bytes > self.memory_budget and len(self._tiles) > 1:
+                _, old = self._tiles.popitem(last=False)
+                self._cached_bytes -= old.width * old.height * self.pixel_bytes
+                old.close()
+            return tile
+
+    def render(self, box, output_size, resample_method, transform=IDENTITY_TRANSFORM):
+        """
+        合成与视口相交的瓦片并缩放到输出尺寸
+
+        Args:
+            box: 显示坐标中的视口 (x0, y0, x1, y1)，可为小数
+            output_size: 输出尺寸 (宽, 高)
+            resample_method: 缩放采样方式
+            transform: 原图坐标 -> 显示坐标的变换（旋转、翻转后），瓦片始终按原图方向保存
+
+        Returns:
+            Image: 渲染结果
+        """
+        if transform != IDENTITY_TRANSFORM:
+            return self._render_transformed(box, output_size, resample_method, transform)
+
+        x0, y0, x1, y1 = box
+        factor = min((x1 - x0) / output_size[0], (y1 - y0) / output_size[1])
+        level = 0
+        while level + 1 < len(self.levels) and (2 << level) <= factor:
+            level += 1
+
+        scale = 1 << level
+        width, height, cols, rows, _ = self.levels[level]
+        lx0, ly0, lx1, ly1 = x0 / scale, y0 / scale, x1 / scale, y1 / scale
+        ix0 = max(0, int(lx0))
+        iy0 = max(0, int(ly0))
+        ix1 = min(width, max(ix0 + 1, -int(-lx1 // 1)))
+        iy1 = min(height, max(iy0 + 1, -int(-ly1 // 1)))
+
+        region = Image.new(self.mode, (ix1 - ix0, iy1 - iy0))
+        for row in range(iy0 // self.tile_size, (iy1 - 1) // self.tile_size + 1):
+            for col in range(ix0 // self.tile_size, (ix1 - 1) // self.tile_size + 1):
+                tile = self.get_tile(level, col, row)
+                region.paste(tile, (col * self.tile_size - ix0, row * self.tile_size - iy0))
+
+        crop_box = (lx0 - ix0, ly0 - iy0, min(lx1, ix1) - ix0, min(ly1, iy1) - iy0)
+        return region.resize(output_size, resample_method, box=crop_box)
+
+    def _render_transformed(self, box, output_size, resample_method, transform):
+        """先按输出分辨率合成视口在原图中的外接区域，再一次仿射变换到输出尺寸"""
+        x0, y0, x1, y1 = box
+        a, b, c, d, e, f = invert_transform(transform)
+        corners = [(a * x + b * y + c, d * x + e * y + f) for x, y in ((x0, y0), (x1, y0), (x1, y1), (x0, y1))]
+        full_width, full_height = self.full_size
+        u0 = max(0.0, min(u for u, _ in corners))
+        v0 = max(0.0, min(v for _, v in corners))
+        u1 = min(full_width, max(u for u, _ in corners))
+        v1 = min(full_height, max(v for _, v in corners))
+        if u1 <= u0 or v1 <= v0:
+            return Image.new(self.mode, output_size)
+
+        step_x = (x1 - x0) / output_size[0]
+        step_y = (y1 - y0) / output_size[1]
+        step = min(step_x, step_y)
+        region_size = (max(1, -int(-(u1 - u0) // step)), max(1, -int(-(v1 - v0) // step)))
+        region = self.render((u0, v0, u1, v1), region_size, resample_method)
+        region_x = (u1 - u0) / region_size[0]
+        region_y = (v1 - v0) / region_size[1]
+
+        # 输出像素 -> 显示坐标 -> 原图坐标 -> 区域像素
+        data = (a * step_x / region_x, b * step_y / region_x, (a * x0 + b * y0 + c - u0) / region_x,
+                d * step_x / region_y, e * step_y / region_y, (d * x0 + e * y0 + f - v0) / region_y)
+        resample = Image.Resampling.NEAREST if resample_method == Image.Resampling.NEAREST \
+            else Image.Resampling.BICUBIC
+        return region.transform(output_size, Image.Transform.AFFINE, data, resample)
+
+    def close(self):
+        """释放瓦片缓存并删除临时文件"""
+        with self.lock:
+            for tile in self._tiles.values():
+                tile.close()
+            self._tiles.clear()
+            self._cached_bytes = 0
+            if not self._mmap.closed:
+                self._mmap.close()
+            self._file.close()
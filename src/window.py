@@ -6,11 +6,10 @@ Window Management Functionality Module - Performance Optimized
 """
 
 import os
-import threading
 import time
+import threading
 import tkinter as tk
-import glob
-import re
+from .directory_index import DirectoryIndex, is_image_file, walk_images, compact_stat
 
 
 class WindowMixin:
@@ -20,8 +19,14 @@ class WindowMixin:
         """窗口大小改变事件"""
         if self.resize_timer:
             self.root.after_cancel(self.resize_timer)
+        self.update_display_target_size()
         self.fast_redraw()
-        self.resize_timer = self.root.after(200, self.high_quality_redraw)
+        self.resize_timer = self.root.after(200, self._on_resize_settled)
+
+    def _on_resize_settled(self):
+        """窗口大小稳定后高质量重绘，必要时加载原图"""
+        self.high_quality_redraw()
+        self.ensure_display_resolution()
 
     def monitor_dialogs(self):
         """后台线程：检测并居中对话框"""
@@ -230,54 +235,176 @@ class WindowMixin:
 
         return False
 
-    def load_directory_images(self, directory):
-        """加载目录中的图片"""
+    def load_directory_images(self, directory, target=None, seed=None):
+        """
+        流式加载目录中的图片
+        有已建立或保存的目录索引时先载入索引，目录修改时间未变则无需扫描；
+        否则目标图片立即放入索引并设为当前图片，其余条目由后台线程扫描后分批并入有序索引。
+        递归浏览时按深度优先顺序遍历子目录，当前图片之后已有足够图片时暂停遍历
+
+        Args:
+            directory: 目录路径
+            target: 需要立即显示的图片路径，为None时使用扫描到的第一张图片
+            seed: 之前为该目录建立的完整索引（如查找相邻目录时），与当前排序方式一致时直接沿用
+        """
         self.last_directory = directory
         self.loading_active = False
-        self.release_all_images()
-        self.image_paths = []
-
-        extensions = ['jpg', 'jpeg', 'png', 'bmp', 'gif', 'webp', 'tiff']
-        pattern = os.path.join(directory, '*')
-
-        for file_path in glob.glob(pattern, recursive=False):
-            ext = os.path.splitext(file_path)[1][1:].lower()
-            if ext in extensions:
-                self.image_paths.append(os.path.normpath(file_path))
-
-        self.image_paths.sort(key=self.natural_sort_key)
-
-        size_threshold = 3 * 1024 * 1024
-        large_image_found = False
+        # 缓存与目录无关，保留已解码的图片，只取消旧目录的预加载任务
+        self.prefetch_pool.cancel_all()
+        self.cancel_preview_refinement()
+        self.scan_generation += 1
+        self.scan_removed.clear()
+        recursive = self.recursive_browsing
+        if seed is not None and (seed.directory, seed.order, seed.recursive) == (directory, self.sort_order, recursive):
+            self.directory_index = seed
+        else:
+            seed = None
+            self.directory_index = DirectoryIndex(directory, self.sort_order, recursive)
+        self.image_paths = self.directory_index.paths
+        self.current_index = 0
 
-        for file_path in self.image_paths:
+        try:
+            dir_mtime_ns = os.stat(directory).st_mtime_ns
+        except OSError as e:
+            print(f"无法读取目录 {directory}: {e}")
+            self.stop_watching_directory()
+            return
+        # 子目录的变化无法由目录修改时间判断，递归浏览时沿用的索引仍需扫描核对
+        fresh = seed is not None and not recursive and seed.dir_mtime_ns == dir_mtime_ns
+        # 在扫描之前记录目录修改时间，扫描期间的变化会使保存的索引在下次打开时失效
+        self.directory_index.dir_mtime_ns = dir_mtime_ns
+        self.directory_index.complete = False
+        walker = walk_images(directory, recursive)
+        # 先开始监视再扫描，扫描期间发生的变化也不会遗漏
+        self.watch_directory(directory)
+        if seed is None:
+            # 递归浏览时不使用保存的索引
+            fresh = not recursive and self.load_directory_listing(self.directory_index)
+
+        target = os.path.normpath(target) if target else None
+        target_stat = None
+        if target and target not in self.directory_index and is_image_file(target) \
+                and self.directory_index.covers(target):
             try:
-                file_size = os.path.getsize(file_path)
-                if file_size > size_threshold:
-                    large_image_found = True
-                    break
+                target_stat = os.stat(target)
             except OSError:
-                continue
+                pass
+        if target_stat is not None:
+            self.directory_index.add([(target, target_stat)])
+        if target in self.directory_index:
+            self.current_index = self.directory_index.position(target)
+        elif not self.image_paths:
+            # 没有目标图片时在当前线程扫描到第一张图片为止
+            for path, stat in walker:
+                self.directory_index.add([(path, stat)])
+                break
 
-        if len(self.image_paths) > 30 or large_image_found:
-            self.show_loading_dialog()
-            self.loading_active = True
-            threading.Thread(target=self.async_load_images, daemon=True).start()
-        else:
-            self.sync_load_images()
-
-    @staticmethod
-    def natural_sort_key(s):
-        """自然排序键"""
-        return [int(text) if text.isdigit() else text.lower() for text in re.split(r'(\d+)', s)]
-
-    def sync_load_images(self):
-        """同步加载图片"""
-        indices = {self.current_index, self.current_index - 1, self.current_index + 1}
-        for idx in indices:
-            if 0 <= idx < len(self.image_paths):
-                self.load_image_to_cache(self.image_paths[idx])
         self.enable_navigation()
+        if fresh:
+            walker.close()
+            self.directory_index.complete = True
+            print(f"已载入目录索引，共 {len(self.image_paths)} 张图片")
+            self.root.after(0, self.start_background_warming)
+            self.root.after(0, self.start_metadata_probe)
+            return
+        threading.Thread(target=self._scan_directory, args=(walker, self.scan_generation, recursive),
+                         daemon=True).start()
+
+    def _scan_directory(self, walker, generation, recursive=False):
+        """后台扫描剩余的目录条目，分批交给主线程合并，结束时附上扫描到的全部路径"""
+        batch = []
+        seen = set()
+        last_flush = time.monotonic()
+        try:
+            for path, stat in walker:
+                if generation != self.scan_generation:
+                    return
+                seen.add(path)
+                batch.append((path, stat))
+
+                now = time.monotonic()
+                if len(batch) >= 4096 or now - last_flush > 0.2:
+                    self.root.after(0, self._merge_scanned_entries, generation, batch)
+                    batch = []
+                    last_flush = now
+
+                if recursive and len(self.image_paths) + len(batch) - self.current_index > self.recursive_lookahead:
+                    # 当前图片之后已有足够图片，暂停遍历直到浏览接近末尾或切换目录
+                    if batch:
+                        self.root.after(0, self._merge_scanned_entries, generation, batch)
+                        batch = []
+                    while generation == self.scan_generation and \
+                            len(self.image_paths) - self.current_index > self.recursive_lookahead // 2:
+                        time.sleep(0.2)
+                    last_flush = time.monotonic()
+        finally:
+            walker.close()
+
+        self.root.after(0, self._merge_scanned_entries, generation, batch, seen)
+
+    def toggle_recursive_browsing(self):
+        """开启或关闭递归浏览子目录，重新加载当前目录并保持当前图片"""
+        self.recursive_browsing = self.recursive_browsing_var.get()
+        self.save_recursive_browsing_config(self.recursive_browsing)
+        print("已开启递归浏览子目录" if self.recursive_browsing else "已关闭递归浏览子目录")
+        if not self.last_directory:
+            return
+        current_path = self.image_paths[self.current_index] if self.image_paths else None
+        self.load_directory_images(self.last_directory, current_path)
+        self.show_current_image()
+
+    def _merge_scanned_entries(self, generation, batch, seen=None):
+        """
+        将一批扫描结果并入目录索引，保持当前图片不变
+        索引来自过期的保存结果时，按扫描结果更新已变化的条目，扫描结束后移除已不存在的条目
+
+        Args:
+            generation: 扫描代数，过期的扫描结果被忽略
+            batch: [(路径, stat结果)]
+            seen: 扫描结束时为扫描到的全部路径，否则为None
+        """
+        if generation != self.scan_generation:
+            return
+
+        index = self.directory_index
+        current_path = self.image_paths[self.current_index] if self.image_paths else None
+        if self.scan_removed:
+            # 扫描线程读取后已被删除或重命名的文件
+            batch = [(path, stat) for path, stat in batch if path not in self.scan_removed]
+        changed = index.add(batch)
+        for path, stat in batch:
+            if index.stats.get(path) != compact_stat(stat):
+                index.update_stat(path, stat)
+                changed = True
+
+        if seen is not None:
+            # 主线程已读取的首个条目和扫描开始后由目录监视新增的文件不在扫描结果中，移除前确认文件确实不存在
+            for path in [path for path in index.stats if path not in seen and not os.path.exists(path)]:
+                index.remove(path)
+                changed = True
+
+        if changed:
+            self.follow_current_path(current_path)
+            if current_path is not None and current_path not in index:
+                self.show_current_image()
+
+        if seen is not None:
+            index.complete = True
+            self.scan_removed.clear()
+            print(f"目录扫描完成，共 {len(self.image_paths)} 张图片")
+            self.start_background_warming()
+            self.start_metadata_probe()
+            self.schedule_listing_save()
+
+    def follow_current_path(self, current_path):
+        """目录索引顺序变化后让当前序号仍指向同一张图片，并按新的相邻图片重新安排预加载"""
+        if current_path is None or not self.image_paths:
+            return
+        try:
+            self.current_index = self.directory_index.position(current_path)
+        except ValueError:
+            self.current_index = min(self.current_index, len(self.image_paths) - 1)
+        self.schedule_prefetch(self.plan_prefetch())
 
     def show_current_image(self):
         """显示当前图片 - 优化版本，在窗口调整前先检查是否需要动画"""
@@ -286,14 +413,16 @@ class WindowMixin:
 
         current_path = self.image_paths[self.current_index]
 
-        preload_indices = {self.current_index - 1, self.current_index + 1}
-        for idx in preload_indices:
-            if 0 <= idx < len(self.image_paths):
-                threading.Thread(target=self.load_image_to_cache,
-                                 args=(self.image_paths[idx],),
-                                 daemon=True).start()
+        self.update_display_target_size()
+        self.schedule_prefetch(self.plan_prefetch())
 
-        if current_path not in self.image_cache:
+        if not self.image_cache.lookup(current_path):
+            if self.needs_tiles(current_path) or self.image_cache.is_loading(current_path):
+                # 超大图片的解码和切瓦片在后台进行，完成后再显示
+                # 已在其他线程解码的图片同样在后台等待，界面线程不阻塞
+                self.root.title(f"图片查看器 - 正在加载 {os.path.basename(current_path)}")
+                self.load_in_background(current_path)
+                return
             self.load_image_to_cache(current_path)
 
         self.root.title(f"图片查看器 - {os.path.basename(current_path)}")
@@ -362,5 +491,4 @@ class WindowMixin:
 
     def update_lru(self, path):
         """更新LRU缓存"""
-        if path in self.lru_list:
-            self.lru_list.move_to_end(path)
\ No newline at end of file
+        self.image_cache.touch(path)
\ No newline at end of file
@@ -5,7 +5,56 @@
 Zoom Functionality Module
 """
 
+import weakref
+import threading
 from PIL import Image
+from .image_cache import ImageCache, apply_transform, resample_mode
+from .tile_store import TileStore
+
+
+class RenderBuffer:
+    """渲染缓冲区 - 记录画布上预渲染区域对应的图片、缩放比例和图片坐标范围"""
+
+    __slots__ = ('path', '_source', 'tiles', 'window_size', 'scale', 'high_quality',
+                 'box', 'scale_x', 'scale_y', 'item')
+
+    def __init__(self, path, source, tiles, window_size, scale, high_quality, box, output_size):
+        self.path = path
+        # 弱引用，缓冲区不延长已被淘汰图片的生命周期
+        self._source = weakref.ref(source)
+        self.tiles = tiles
+        self.window_size = window_size
+        self.scale = scale
+        self.high_quality = high_quality
+        self.box = box
+        # 取整后的实际缩放比例，用于换算画布坐标
+        self.scale_x = output_size[0] / (box[2] - box[0])
+        self.scale_y = output_size[1] / (box[3] - box[1])
+        self.item = None
+
+    def matches(self, path, source, tiles, window_size, scale, high_quality):
+        """是否为同一图片、同一缩放比例的渲染结果；高质量请求不能使用快速渲染的结果"""
+        return (self.path == path and self._source() is source and self.tiles is tiles
+                and self.window_size == window_size and abs(self.scale - scale) <= 1e-9 * scale
+                and (self.high_quality or not high_quality))
+
+    def covers(self, visible, image_size, margin):
+        """
+        视口是否仍在缓冲区内，且与缓冲区边缘保留足够余量（缓冲区边缘即图片边缘时不需要余量）
+
+        Args:
+            visible: 视口 (x0, y0, x1, y1)
+            image_size: 图片尺寸 (宽, 高)
+            margin: 余量占视口尺寸的比例
+        """
+        margin_x = (visible[2] - visible[0]) * margin
+        margin_y = (visible[3] - visible[1]) * margin
+        x0, y0, x1, y1 = self.box
+        return ((x0 == 0 or visible[0] - x0 >= margin_x)
+                and (y0 == 0 or visible[1] - y0 >= margin_y)
+                and (x1 == image_size[0] or x1 - visible[2] >= margin_x)
+                and (y1 == image_size[1] or y1 - visible[3] >= margin_y)
+                and x0 <= visible[0] and y0 <= visible[1] and visible[2] <= x1 and visible[3] <= y1)
 
 
 class ZoomMixin:
@@ -72,10 +121,10 @@ class ZoomMixin:
         if not self.image_paths or self.is_playing:
             return
         current_path = self.image_paths[self.current_index]
-        img_data = self.image_cache.get(current_path)
-        if not img_data:
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None:
             return
-        img, _ = img_data
+        img = entry.image
 
         rel_x = (img_x - self.viewport_x) / self.viewport_width
         rel_y = (img_y - self.viewport_y) / self.viewport_height
@@ -95,7 +144,8 @@ class ZoomMixin:
             fill_screen_zoom = window_width / orig_width
 
         min_zoom = fill_screen_zoom
-        max_zoom = 5.0
+        # 最大放大到原图像素的5倍（代理图和瓦片概览图按原图尺寸换算）
+        max_zoom = 5.0 * entry.scale
         self.zoom_factor = max(min_zoom, min(max_zoom, new_zoom_factor))
 
         # 确保小图片也能正确铺满屏幕
@@ -122,6 +172,118 @@ class ZoomMixin:
         self.viewport_y = max(0, min(self.viewport_y, orig_height - self.viewport_height))
 
         self.fast_redraw()
+        self.ensure_display_resolution()
+
+    def update_display_target_size(self):
+        """根据画布和屏幕尺寸更新解码目标尺寸"""
+        screen_width = int(self.root.winfo_screenwidth() * 0.69)
+        screen_height = int(self.root.winfo_screenheight() * 0.69)
+        width = max(self.canvas.winfo_width(), screen_width)
+        height = max(self.canvas.winfo_height(), screen_height)
+        self.display_target_size = (
+            int(width * self.decode_zoom_margin),
+            int(height * self.decode_zoom_margin)
+        )
+
+    def ensure_display_resolution(self):
+        """当前显示比例超出代理图分辨率时，后台加载原图"""
+        if not self.image_paths:
+            return
+        current_path = self.image_paths[self.current_index]
+        entry = self.image_cache.get_entry(current_path)
+        if entry is None or not entry.is_proxy or entry.tiles is not None:
+            return
+
+        window_width = self.canvas.winfo_width()
+        window_height = self.canvas.winfo_height()
+        if window_width < 10 or window_height < 10:
+            return
+
+        # 每个图片像素对应的屏幕像素数，大于1说明代理图已被放大
+        display_scale = min(window_width / self.viewport_width, window_height / self.viewport_height)
+        if display_scale > 1.0:
+            self.request_full_resolution(current_path)
+
+    def request_full_resolution(self, path):
+        """
+        后台解码原图，完成后替换缓存中的代理图
+        原图超出单张缓存上限时改为切成磁盘瓦片，放大时只读取视口内的原图区域
+        """
+        if path in self.full_resolution_pending:
+            return
+        entry = self.image_cache.get_entry(path)
+        if entry is None:
+            return
+
+        self.full_resolution_pending.add(path)
+
+        full_width, full_height = entry.full_size
+        transform = entry.transform
+        if ImageCache.predict_size(entry.image.mode, entry.full_size) > self.image_cache.limit * 0.5:
+            print(f"原图过大，放大时按区域加载: {full_width}x{full_height}")
+            threading.Thread(target=self._build_full_resolution_tiles, args=(path, entry), daemon=True).start()
+            return
+
+        def decode():
+            try:
+                img, _ = self._decode_image(self.open_image_source(path))
+                # 代理图已旋转或翻转时，对原图做同样的变换
+                transformed = apply_transform(img, transform, (full_width, full_height))
+                if transformed is not img:
+                    img.close()
+                    img = transformed
+            except Exception as e:
+                print(f"无法加载原图 {path}: {e}")
+                self.root.after(0, self.full_resolution_pending.discard, path)
+                return
+            self.root.after(0, self._apply_full_resolution, path, img, transform)
+
+        threading.Thread(target=decode, daemon=True).start()
+
+    def _build_full_resolution_tiles(self, path, entry):
+        """后台把原图切成磁盘瓦片，完成后挂接到代理图"""
+        try:
+            tile_mode = 'L' if entry.image.mode in ('1', 'L') else 'RGB'
+            self._check_transient_size(path, ImageCache.predict_size(tile_mode, entry.full_size))
+            store = TileStore.from_image(TileStore.decode(self.open_image_source(path)), self.tile_memory_budget())
+        except Exception as e:
+            print(f"无法加载原图 {path}: {e}")
+            self.root.after(0, self.full_resolution_pending.discard, path)
+            return
+        self.root.after(0, self._apply_full_resolution_tiles, path, entry, store)
+
+    def _apply_full_resolution_tiles(self, path, entry, store):
+        """将瓦片存储挂接到代理图并重绘"""
+        self.full_resolution_pending.discard(path)
+        current = self.image_cache.get_entry(path)
+        if current is None or current.stamp != entry.stamp:
+            # 代理图已被淘汰或文件已变化，放弃升级；旋转、翻转后的代理图仍可使用原图方向的瓦片
+            store.close()
+            return
+        if not self.image_cache.attach_tiles(path, store):
+            return
+        if self.image_paths and self.image_paths[self.current_index] == path:
+            self.high_quality_redraw()
+
+    def _apply_full_resolution(self, path, img, transform):
+        """用原图替换代理图，并把视口换算到原图坐标"""
+        self.full_resolution_pending.discard(path)
+        entry = self.image_cache.get_entry(path)
+        if entry is None or not entry.is_proxy or entry.transform != transform:
+            # 代理图已被淘汰，或解码期间又被旋转、翻转，放弃升级
+            img.close()
+            return
+
+        factor = img.width / entry.image.width
+        self.image_cache.replace(path, img)
+
+        if self.image_paths and self.image_paths[self.current_index] == path:
+            self.viewport_x *= factor
+            self.viewport_y *= factor
+            self.viewport_width *= factor
+            self.viewport_height *= factor
+            self.zoom_factor /= factor
+            self.high_quality_redraw()
 
     def fast_redraw(self):
         """快速重绘"""
@@ -130,7 +292,7 @@ class ZoomMixin:
         current_path = self.image_paths[self.current_index]
         img_data = self.image_cache.get(current_path)
         if img_data:
-            self.redraw_image(img_data[0], Image.Resampling.NEAREST)
+            self.redraw_image(img_data[0], Image.Resampling.NEAREST, current_path)
 
     def high_quality_redraw(self):
         """高质量重绘"""
@@ -139,10 +301,19 @@ class ZoomMixin:
         current_path = self.image_paths[self.current_index]
         img_data = self.image_cache.get(current_path)
         if img_data:
-            self.redraw_image(img_data[0], Image.Resampling.LANCZOS)
-
-    def redraw_image(self, img, resample_method):
-        """重绘图像"""
+            self.redraw_image(img_data[0], Image.Resampling.LANCZOS, current_path)
+
+    def redraw_image(self, img, resample_method, path=None):
+        """
+        重绘图像
+        渲染比视口更大的缓冲区，视口仍在缓冲区内时只移动画布项，
+        视口接近缓冲区边缘、缩放比例或图片变化时才重新渲染
+
+        Args:
+            img: 要绘制的图片
+            resample_method: 缩放采样方式
+            path: 图片的缓存路径，提供时从金字塔中选取最接近输出尺寸的层级裁剪
+        """
         window_width = self.canvas.winfo_width()
         window_height = self.canvas.winfo_height()
         if window_width < 10 or window_height < 10:
@@ -158,23 +329,14 @@ class ZoomMixin:
         viewport_w = min(self.viewport_width, img.width)
         viewport_h = min(self.viewport_height, img.height)
 
-        box = (
-            int(max(0, self.viewport_x)),
-            int(max(0, self.viewport_y)),
-            int(min(img.width, self.viewport_x + viewport_w)),
-            int(min(img.height, self.viewport_y + viewport_h))
-        )
+        entry = self.image_cache.get_entry(path) if path is not None else None
+        if entry is not None and entry.image is not img:
+            entry = None
+        tiles = entry.tiles if entry is not None else None
 
-        # 防止无效的裁剪区域
-        if box[2] <= box[0] or box[3] <= box[1]:
-            box = (0, 0, img.width, img.height)
-
-        cropped_img = img.crop(box)
-
-        # 计算实际显示尺寸，保持纵横比
-        crop_aspect = cropped_img.width / cropped_img.height
+        # 计算视口的显示尺寸，保持纵横比并居中
+        crop_aspect = viewport_w / viewport_h
         window_aspect = window_width / window_height
-
         if window_aspect > crop_aspect:
             new_height = window_height
             new_width = int(new_height * crop_aspect)
@@ -185,11 +347,90 @@ class ZoomMixin:
         # 防止尺寸为0
         new_width = max(1, new_width)
         new_height = max(1, new_height)
+        scale = new_width / viewport_w
+        left = (window_width - new_width) / 2
+        top = (window_height - new_height) / 2
+        visible = (self.viewport_x, self.viewport_y, self.viewport_x + viewport_w, self.viewport_y + viewport_h)
+
+        high_quality = resample_method != Image.Resampling.NEAREST
+        buffer = self.render_buffer
+        if (buffer is not None
+                and buffer.matches(path, img, tiles, (window_width, window_height), scale, high_quality)
+                and buffer.covers(visible, img.size, self.render_overscan_margin)
+                and buffer.item is not None and self.canvas.type(buffer.item)):
+            self._place_render_buffer(buffer, left, top)
+            return
 
-        resized_img = cropped_img.resize((new_width, new_height), resample_method)
+        # 视口四周各扩展一定比例，裁剪到图片范围内
+        pad_x = viewport_w * self.render_overscan
+        pad_y = viewport_h * self.render_overscan
+        box = (
+            max(0, int(visible[0] - pad_x)),
+            max(0, int(visible[1] - pad_y)),
+            min(img.width, -int(-(visible[2] + pad_x) // 1)),
+            min(img.height, -int(-(visible[3] + pad_y) // 1))
+        )
+        output_size = (
+            max(1, round((box[2] - box[0]) * scale)),
+            max(1, round((box[3] - box[1]) * scale))
+        )
+
+        if tiles is not None:
+            # 瓦片模式：只合成与缓冲区相交的瓦片
+            tile_box = tuple(value * entry.scale for value in box)
+            rendered_img = tiles.render(tile_box, output_size, resample_method, entry.transform)
+        else:
+            rendered_img = self._render_region(img, entry, path, box, output_size, resample_method)
+
+        self.render_buffer = RenderBuffer(path, img, tiles, (window_width, window_height), scale,
+                                          high_quality, box, output_size)
+        self._show_render_buffer(self.render_buffer, rendered_img, left, top)
+
+    def _render_region(self, img, entry, path, box, output_size, resample_method):
+        """裁剪图片区域并缩放到输出尺寸"""
+        crop_width = box[2] - box[0]
+        crop_height = box[3] - box[1]
+
+        # 从仍能覆盖输出尺寸的最小金字塔层级裁剪，开销与输出尺寸相当
+        source, factor = img, 1
+        if entry is not None:
+            max_factor = min(crop_width / output_size[0], crop_height / output_size[1])
+            level_img, level_factor = self.image_cache.pyramid_level(path, max_factor)
+            if level_img is not None:
+                source, factor = level_img, level_factor
+
+        if factor > 1:
+            box = (
+                box[0] // factor,
+                box[1] // factor,
+                min(source.width, -(-box[2] // factor)),
+                min(source.height, -(-box[3] // factor))
+            )
+
+        # 只对显示区域展开二值图和调色板图，缓存中保持紧凑模式
+        cropped_img = source.crop(box)
+        mode = resample_mode(cropped_img)
+        if mode != cropped_img.mode:
+            cropped_img = cropped_img.convert(mode)
+        return cropped_img.resize(output_size, resample_method)
+
+    def _place_render_buffer(self, buffer, left, top):
+        """按当前视口移动缓冲区画布项，视口左上角对齐显示区域左上角"""
+        x = left + (buffer.box[0] - self.viewport_x) * buffer.scale_x
+        y = top + (buffer.box[1] - self.viewport_y) * buffer.scale_y
+        self.canvas.coords(buffer.item, round(x), round(y))
+
+    def _show_render_buffer(self, buffer, rendered_img, left, top):
+        """将渲染好的缓冲区显示到画布上"""
         from PIL import ImageTk
-        tk_img = ImageTk.PhotoImage(resized_img)
+        # Tk照片图像不支持灰度透明，转换为RGBA以保留透明通道
+        if rendered_img.mode == 'LA':
+            rendered_img = rendered_img.convert('RGBA')
+        tk_img = ImageTk.PhotoImage(rendered_img)
+        # Tk照片图像按每像素4字节保存一份副本
+        self.image_cache.reserve('photo_image', tk_img.width() * tk_img.height() * 4)
 
         self.canvas.delete("all")
-        self.canvas.create_image(window_width // 2, window_height // 2, anchor="center", image=tk_img)
-        self.canvas.image = tk_img
\ No newline at end of file
+        buffer.item = self.canvas.create_image(0, 0, anchor="nw", image=tk_img)
+        self.canvas.image = tk_img
+        self._place_render_buffer(buffer, left, top)